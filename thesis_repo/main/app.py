@@ -1,182 +1,530 @@
-import sqlite3
-import fitz  # PyMuPDF
+import io
+import os
+import re
+import json
 import base64
-from flask import Flask, render_template, jsonify, request
-from datetime import datetime
+import hashlib
+import threading
+import fitz  # PyMuPDF
+from PIL import Image
+from flask import Flask, Response, render_template, jsonify, request, send_file, url_for, abort, stream_with_context
+from migrations import migrate
+from disk_cache import DiskCache
+from pdf_utils import find_abstract_page
+from trigram_search import TRIGRAM_TABLE, TRIGRAM_BM25, has_trigram_index, substring_query, query_trigrams, fuzzy_query
+import db
+import export_engine
+import pdf_store
 
 app = Flask(__name__)
 DATABASE = 'thesis_repository.db'
 
+# Rendered abstract pages, cached on disk across requests and restarts
+RENDER_CACHE = DiskCache(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_cache"),
+    max_bytes=500 * 1024 * 1024
+)
 
-# --- Database connection helper ---
-def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Make sure the schema (including the full-text index) is up to date
+migrate(DATABASE)
 
+# Pooled connections, one per request, returned to the pool when the request ends
+db.init_app(app, DATABASE)
 
-# --- Utility functions ---
-def get_thesis_count():
-    conn = get_db_connection()
-    count = conn.execute("SELECT COUNT(*) FROM theses").fetchone()[0]
-    conn.close()
-    return count
+# Substring search needs SQLite's trigram tokenizer (see migrations.create_trigram_index)
+_conn = app.extensions["db_pool"].acquire()
+try:
+    TRIGRAM_SEARCH = has_trigram_index(_conn)
+finally:
+    app.extensions["db_pool"].release(_conn)
 
 
-def get_recent_theses(limit=10):
-    conn = get_db_connection()
-    theses = conn.execute(
+# --- Database connection helper ---
+def get_db_connection():
+    return db.get_db()
+
+
+# --- Landing page statistics ---
+# Everything the index page shows, loaded once and reused until the theses
+# table changes. The triggers from migrations.create_change_counter bump
+# theses_changes.version on every insert, update and delete (from any process).
+RECENT_LIMIT = 10
+_stats_lock = threading.Lock()
+_stats_cache = {"version": None, "stats": None}
+
+
+MONTH_NAMES = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+DATE_PATTERN = re.compile(r"(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2}):\d{2}")
+
+
+def format_upload_date(value):
+    """
+    Formats '2024-03-05 14:07:00' as 'Mar 05, 2024 - 02:07 PM' (the same as
+    strptime + strftime, but several times faster). Other values are returned as-is.
+    """
+    match = DATE_PATTERN.fullmatch(value) if isinstance(value, str) else None
+    if not match:
+        return value
+    year, month, day, hour, minute = match.groups()
+    month, hour = int(month), int(hour)
+    if not 1 <= month <= 12 or hour > 23:
+        return value
+    return f"{MONTH_NAMES[month - 1]} {day}, {year} - {hour % 12 or 12:02d}:{minute} {'AM' if hour < 12 else 'PM'}"
+
+
+def load_landing_stats(conn, recent_limit=RECENT_LIMIT):
+    """Computes the counts and latest uploads shown on the index page."""
+    course_counts = {}
+    year_counts = {}
+    total_count = 0
+    # One pass over the table gives every count at once
+    for row in conn.execute("SELECT course, year, COUNT(*) AS n FROM theses GROUP BY course, year"):
+        total_count += row["n"]
+        course_counts[row["course"]] = course_counts.get(row["course"], 0) + row["n"]
+        if row["year"] is not None:
+            year = str(row["year"])
+            year_counts[year] = year_counts.get(year, 0) + row["n"]
+
+    recent = conn.execute(
         "SELECT title, course, date_uploaded FROM theses ORDER BY date_uploaded DESC LIMIT ?",
-        (limit,)
+        (recent_limit,)
     ).fetchall()
-    conn.close()
-
-    formatted_theses = []
-    for thesis in theses:
-        try:
-            dt_obj = datetime.strptime(thesis['date_uploaded'], "%Y-%m-%d %H:%M:%S")
-            date_uploaded = dt_obj.strftime("%b %d, %Y - %I:%M %p")
-        except:
-            date_uploaded = thesis['date_uploaded']
-
-        formatted_theses.append({
-            'title': thesis['title'],
-            'course': thesis['course'],
-            'date_uploaded': date_uploaded
-        })
-    return formatted_theses
-
 
-def get_courses():
+    return {
+        "total_count": total_count,
+        "course_counts": dict(sorted(course_counts.items())),
+        "year_counts": dict(sorted(year_counts.items(), reverse=True)),
+        "recent_entries": [
+            {
+                "title": r["title"],
+                "course": r["course"],
+                "date_uploaded": format_upload_date(r["date_uploaded"])
+            }
+            for r in recent
+        ],
+    }
+
+
+def get_landing_stats():
+    """Returns the cached landing page statistics, reloading them only if the table changed."""
     conn = get_db_connection()
-    rows = conn.execute("SELECT DISTINCT course FROM theses ORDER BY course ASC").fetchall()
-    conn.close()
-    return [r["course"] for r in rows]
-
-
-def get_years():
+    version = conn.execute("SELECT version FROM theses_changes WHERE id = 1").fetchone()[0]
+    if _stats_cache["version"] == version:
+        return _stats_cache["stats"]
+
+    with _stats_lock:
+        # Another request may have reloaded them while we waited
+        if _stats_cache["version"] != version:
+            _stats_cache["stats"] = load_landing_stats(conn)
+            _stats_cache["version"] = version
+        return _stats_cache["stats"]
+
+
+def to_fts_query(text, column=None):
+    """Turns free text into an FTS5 MATCH expression of prefix terms, e.g. 'sant*' AND 'juan*'."""
+    terms = [f'"{token}"*' for token in re.findall(r"\w+", text)]
+    if not terms:
+        return ""
+    expression = " ".join(terms)
+    if column:
+        expression = f"{column} : ({expression})"
+    return expression
+
+
+# --- Thesis files ---
+# Documents are looked up by thesis_id, never by a path sent by the client.
+# The map from id to file is loaded once and reloaded only after the theses
+# table changes (theses_changes, like the landing page statistics).
+_files_lock = threading.Lock()
+_files_cache = {"version": None, "files": {}}
+
+
+def load_thesis_files(conn):
+    """{thesis_id: (absolute PDF path, abstract_page, download file name)} for every thesis."""
+    return {
+        r["thesis_id"]: (pdf_store.absolute_path(r["file_path"]), r["abstract_page"],
+                         pdf_store.export_filename(r["title"], r["file_path"]))
+        for r in conn.execute("SELECT thesis_id, title, file_path, abstract_page FROM theses")
+    }
+
+
+def get_thesis_file(thesis_id):
+    """(absolute PDF path, abstract_page, download name) of a thesis; aborts with 404 if it or its PDF is missing."""
     conn = get_db_connection()
-    rows = conn.execute("SELECT DISTINCT year FROM theses WHERE year IS NOT NULL ORDER BY year DESC").fetchall()
-    conn.close()
-    return [str(r["year"]) for r in rows]
-
-
-# --- ABSTRACT IMAGE FUNCTION ---
-def extract_abstract_images(pdf_path):
-    """Extract the page containing 'abstract' and the next page as base64 images."""
-    images = []
-    try:
-        doc = fitz.open(pdf_path)
-        abstract_found = False
-
-        for i in range(len(doc)):
-            page = doc.load_page(i)
-            text = page.get_text()
-            
-            if not abstract_found and "abstract" in text.lower():
-                # Extract this page
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                img_bytes = pix.tobytes("png")
-                images.append(base64.b64encode(img_bytes).decode("utf-8"))
-                abstract_found = True
-
-                # Extract the next page if it exists
-                if i + 1 < len(doc):
-                    next_page = doc.load_page(i + 1)
-                    pix2 = next_page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                    img_bytes2 = pix2.tobytes("png")
-                    images.append(base64.b64encode(img_bytes2).decode("utf-8"))
-                break  # Stop after extracting abstract + next page
-
-        doc.close()
-    except Exception as e:
-        print(f"Error extracting abstract images: {e}")
-
-    return images
+    version = conn.execute("SELECT version FROM theses_changes WHERE id = 1").fetchone()[0]
+    if _files_cache["version"] != version:
+        with _files_lock:
+            # Another request may have reloaded it while we waited
+            if _files_cache["version"] != version:
+                _files_cache["files"] = load_thesis_files(conn)
+                _files_cache["version"] = version
+
+    entry = _files_cache["files"].get(thesis_id)
+    if entry is None or not os.path.isfile(entry[0]):
+        abort(404)
+    return entry
+
+
+def abstract_cache_key(pdf_path):
+    """Cache key for a PDF: changes whenever the file is moved, modified or resized."""
+    stat = os.stat(pdf_path)
+    raw = f"{os.path.abspath(pdf_path)}|{stat.st_mtime_ns}|{stat.st_size}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+# --- Page images ---
+# Pages are rendered one image per page and size, on demand, into RENDER_CACHE.
+# The abstract modal shows a small preview first and swaps in the sharp image.
+PAGE_SCALES = (0.5, 1.0, 2.0)
+PAGE_PREVIEW_SCALE = 0.5
+PAGE_FULL_SCALE = 2.0
+PAGE_WEBP_QUALITY = 80
+
+
+def get_abstract_pages(pdf_path, abstract_page=None):
+    """
+    Indexes of the abstract page and the page after it ([] if there is no
+    abstract). A PDF whose abstract page isn't stored is searched once; the
+    result is kept in RENDER_CACHE.
+    """
+    name = f"{abstract_cache_key(pdf_path)}-pages-{abstract_page}.json"
+    cached = RENDER_CACHE.read(name)
+    if cached is not None:
+        return json.loads(cached)
+
+    with fitz.open(pdf_path) as doc:
+        if abstract_page is None:
+            abstract_page = find_abstract_page(doc)
+        pages = []
+        if abstract_page is not None and 0 <= abstract_page < len(doc):
+            pages = list(range(abstract_page, min(abstract_page + 2, len(doc))))
+    RENDER_CACHE.put(name, json.dumps(pages).encode("utf-8"))
+    return pages
+
+
+def render_page_webp(pdf_path, page_number, scale):
+    """One page as WebP bytes at scale x 72 dpi, or None if the PDF has no such page."""
+    with fitz.open(pdf_path) as doc:
+        if not 0 <= page_number < len(doc):
+            return None
+        pix = doc.load_page(page_number).get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+    image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    output = io.BytesIO()
+    image.save(output, "WEBP", quality=PAGE_WEBP_QUALITY)
+    return output.getvalue()
 
 
 
 # --- ROUTES ---
 @app.route('/')
 def index():
-    total_count = get_thesis_count()
-    recent_entries = get_recent_theses(limit=10)
-    courses = get_courses()
-    years = get_years()
+    stats = get_landing_stats()
     return render_template(
         'index.html',
-        total_count=total_count,
-        recent_entries=recent_entries,
-        courses=courses,
-        years=years
+        total_count=stats["total_count"],
+        recent_entries=stats["recent_entries"],
+        courses=list(stats["course_counts"]),
+        years=list(stats["year_counts"]),
+        course_counts=stats["course_counts"],
+        year_counts=stats["year_counts"]
     )
 
 
-@app.route('/api/search')
-def api_search():
-    query = request.args.get('query', '').lower()
-    year = request.args.get('year', '').strip()
-    course = request.args.get('course', '').strip()
-    keyword = request.args.get('keyword', '').lower().strip()
-
-    conn = get_db_connection()
-    sql = "SELECT title, course, year, date_uploaded, authors, keywords, file_path FROM theses WHERE 1=1"
-    params = []
-
-    if query:
-        sql += " AND (LOWER(title) LIKE ? OR LOWER(authors) LIKE ?)"
-        params.append(f"%{query}%")
-        params.append(f"%{query}%")   # second one for authors
+# --- Search ---
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_PAGE_SIZE = 200
+SEARCH_COLUMNS = "t.thesis_id, t.title, t.course, t.year, t.date_uploaded, t.authors, t.keywords, t.file_path"
+BM25 = "bm25(theses_fts, 10.0, 5.0, 3.0, 1.0)"
+
+# How the query text is matched, tried in this order until one finds something:
+# whole words / prefixes, then substrings inside words, then similar spellings
+SEARCH_MODES = ("words", "substring", "fuzzy")
+
+
+def search_modes(args):
+    """The modes worth trying for a search request (the fallbacks need a word of 3+ letters)."""
+    query = args.get('query', '')
+    modes = ["words"]
+    if TRIGRAM_SEARCH and substring_query(query):
+        modes.append("substring")
+    if query_trigrams(query):
+        modes.append("fuzzy")
+    return modes
+
+
+def pick_search_mode(conn, args):
+    """The first of search_modes(args) that matches any row (the last one if none do)."""
+    modes = search_modes(args)
+    for mode in modes[:-1]:
+        from_sql, where_sql, params, _ = build_search_filters(args, mode)
+        if conn.execute(f"SELECT 1 FROM {from_sql} WHERE {where_sql} LIMIT 1", params).fetchone():
+            return mode
+    return modes[-1]
+
+
+def build_search_filters(args, mode="words"):
+    """
+    Turns the query string of a search request into (from_sql, where_sql, params, rank_sql).
+    rank_sql orders full-text searches by relevance (lower is better) and
+    is None for the rest, which are ordered by upload date. mode says how
+    the query text is matched (see SEARCH_MODES); the keyword filter always
+    matches words.
+    """
+    query = args.get('query', '').lower()
+    year = args.get('year', '').strip()
+    course = args.get('course', '').strip()
+    keyword = args.get('keyword', '').lower().strip()
+
+    keyword_match = to_fts_query(keyword, column="keywords") if keyword else ""
+    rank_sql = None
+
+    if mode == "fuzzy":
+        text_match = fuzzy_query(get_db_connection(), query)
+    else:
+        text_match = to_fts_query(query)
+
+    if mode == "substring":
+        from_sql = f"{TRIGRAM_TABLE} JOIN theses t ON t.thesis_id = {TRIGRAM_TABLE}.rowid"
+        where_sql = f"{TRIGRAM_TABLE} MATCH ?"
+        params = [substring_query(query)]
+        rank_sql = TRIGRAM_BM25
+    elif mode == "fuzzy" and not text_match:
+        # Some word has no similar spelling anywhere
+        from_sql = "theses t"
+        where_sql = "0"
+        params = []
+    else:
+        match = " AND ".join(term for term in (text_match, keyword_match) if term)
+        keyword_match = ""  # already part of match
+        if match:
+            from_sql = "theses_fts JOIN theses t ON t.thesis_id = theses_fts.rowid"
+            where_sql = "theses_fts MATCH ?"
+            params = [match]
+            rank_sql = BM25
+        else:
+            from_sql = "theses t"
+            where_sql = "1=1"
+            params = []
+
+    if keyword_match:
+        where_sql += " AND t.thesis_id IN (SELECT rowid FROM theses_fts WHERE theses_fts MATCH ?)"
+        params.append(keyword_match)
 
     if year:
-        sql += " AND CAST(year AS TEXT) = ?"
-        params.append(str(year))
+        # year is stored as an INTEGER (see migrations.normalize_year), so this can use an index
+        where_sql += " AND t.year = ?"
+        params.append(int(year) if year.isdigit() else year)
 
     if course:
-        sql += " AND course = ?"
+        where_sql += " AND t.course = ?"
         params.append(course)
 
-    if keyword:
-        sql += " AND LOWER(keywords) LIKE ?"
-        params.append(f"%{keyword}%")
-
-    sql += " ORDER BY date_uploaded DESC LIMIT 100"
-    results = conn.execute(sql, params).fetchall()
-    conn.close()
-
-    formatted = []
-    for r in results:
-        try:
-            dt = datetime.strptime(r["date_uploaded"], "%Y-%m-%d %H:%M:%S")
-            formatted_date = dt.strftime("%b %d, %Y - %I:%M %p")
-        except:
-            formatted_date = r["date_uploaded"]
-
-        formatted.append({
-            "title": r["title"].replace("_", " ").replace("-", " ").strip(),  # cleaned
-            "course": r["course"],
-            "year": str(r["year"]) if r["year"] else "-",
-            "date_uploaded": formatted_date,
-            "authors": r["authors"] or "-",
-            "keywords": r["keywords"] or "-",
-            "pdf_path": r["file_path"]
-        })
+    return from_sql, where_sql, params, rank_sql
 
-    return jsonify(formatted)
 
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
 
-# --- New route for multiple abstract images ---
-@app.route('/get_abstract_image')
-def get_abstract_image():
-    pdf_file = request.args.get('pdf')
-    if not pdf_file:
-        return jsonify({"error": "No file path provided."})
 
-    images = extract_abstract_images(pdf_file)
-    if not images:
-        return jsonify({"error": "Failed to extract images."})
+def decode_cursor(cursor):
+    """Returns the [sort value, thesis_id, search mode] inside a cursor, or aborts with 400."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        abort(400)
+    if not isinstance(values, list) or len(values) != 3 or values[2] not in SEARCH_MODES:
+        abort(400)
+    return values
+
+
+def format_search_row(r):
+    return {
+        "thesis_id": r["thesis_id"],
+        "title": r["title"].replace("_", " ").replace("-", " ").strip(),  # cleaned
+        "course": r["course"],
+        "year": str(r["year"]) if r["year"] else "-",
+        "date_uploaded": format_upload_date(r["date_uploaded"]),
+        "authors": r["authors"] or "-",
+        "keywords": r["keywords"] or "-",
+        "pdf_url": url_for('thesis_pdf', thesis_id=r["thesis_id"])
+    }
+
 
-    return jsonify({"images": images})
+@app.route('/api/search')
+def api_search():
+    """
+    Searches theses, one page at a time.
+
+    Query string: query, keyword, course, year (filters); limit (page size);
+    cursor (the next_cursor of the previous page); include_total=1 to also
+    count every match; format=ndjson to stream all matches, one JSON object per line.
+
+    Pages are fetched by keyset ("rows after the last one seen") rather than
+    by offset, so a deep page costs the same as the first one. Full-text
+    searches page through (relevance, thesis_id), the rest through
+    (date_uploaded, thesis_id), newest first.
+
+    When the words of the query match nothing, the search falls back to
+    substrings and then to similar spellings (see SEARCH_MODES); "mode" in
+    the response says which one answered, and the cursor keeps it.
+    """
+    conn = get_db_connection()
+
+    cursor = request.args.get('cursor')
+    after = decode_cursor(cursor) if cursor else None
+    mode = after[2] if after else pick_search_mode(conn, request.args)
+
+    from_sql, where_sql, params, rank_sql = build_search_filters(request.args, mode)
+    if rank_sql:
+        sort_value = rank_sql
+        order_sql = f"{rank_sql} ASC, t.thesis_id ASC"
+    else:
+        sort_value = "t.date_uploaded"
+        order_sql = "t.date_uploaded DESC, t.thesis_id DESC"
+    select_sql = f"SELECT {SEARCH_COLUMNS}, {sort_value} AS sort_value FROM {from_sql} WHERE {where_sql}"
+
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            for r in conn.execute(f"{select_sql} ORDER BY {order_sql}", params):
+                yield json.dumps(format_search_row(r)) + "\n"
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    try:
+        limit = min(max(int(request.args.get('limit', SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        abort(400)
+
+    page_sql = select_sql
+    page_params = list(params)
+    if after:
+        page_sql += f" AND ({sort_value}, t.thesis_id) {'>' if rank_sql else '<'} (?, ?)"
+        page_params.extend(after[:2])
+
+    # One extra row tells us whether there is another page
+    rows = conn.execute(f"{page_sql} ORDER BY {order_sql} LIMIT ?", page_params + [limit + 1]).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    response = {
+        "results": [format_search_row(r) for r in rows],
+        "next_cursor": encode_cursor([rows[-1]["sort_value"], rows[-1]["thesis_id"], mode]) if has_more else None,
+        "mode": mode
+    }
+    if request.args.get('include_total') == '1':
+        response["total"] = conn.execute(f"SELECT COUNT(*) FROM {from_sql} WHERE {where_sql}", params).fetchone()[0]
+    return jsonify(response)
+
+
+# --- Export ---
+# One download is capped like a search page is, so nobody pulls the whole repository by accident
+EXPORT_MAX_FILES = 1000
+
+
+def export_download_name(args):
+    """e.g. "theses-BSCS-2021.zip", from the course and year filters."""
+    parts = ["theses"] + [args.get(name, '').strip() for name in ("course", "year")]
+    name = "-".join(part for part in parts if part)
+    return re.sub(r"[^\w.-]", "_", name) + ".zip"
+
+
+@app.route('/api/export')
+def api_export():
+    """
+    Downloads the PDFs matching a search as one ZIP, sorted into a folder per
+    course, with a manifest.csv of their details and SHA-256 checksums.
+
+    Takes the same filters as /api/search (query, keyword, course, year) and
+    matches them the same way. The archive is built while it is sent
+    (chunked transfer encoding), so it is never held in memory or written
+    to disk.
+    """
+    conn = get_db_connection()
+    mode = pick_search_mode(conn, request.args)
+    from_sql, where_sql, params, rank_sql = build_search_filters(request.args, mode)
+    order_sql = f"{rank_sql} ASC, t.thesis_id ASC" if rank_sql else "t.date_uploaded DESC, t.thesis_id DESC"
+    records = conn.execute(
+        f"SELECT t.thesis_id, t.title, t.authors, t.course, t.year, t.file_path "
+        f"FROM {from_sql} WHERE {where_sql} ORDER BY {order_sql} LIMIT ?",
+        params + [EXPORT_MAX_FILES + 1]
+    ).fetchall()
+    if len(records) > EXPORT_MAX_FILES:
+        return jsonify({"error": f"More than {EXPORT_MAX_FILES} theses match; narrow the filters."}), 400
+
+    planned, _ = export_engine.plan_export([tuple(r) for r in records])
+    if not planned:
+        return jsonify({"error": "No PDFs match these filters."}), 404
+
+    # Everything the archive needs is read already, so the connection goes back
+    # to the pool now instead of staying checked out for the whole download
+    response = Response(export_engine.iter_zip(planned), mimetype="application/zip")
+    response.headers["Content-Disposition"] = f'attachment; filename="{export_download_name(request.args)}"'
+    return response
+
+
+@app.route('/thesis/<int:thesis_id>/abstract')
+def thesis_abstract(thesis_id):
+    """
+    The abstract's page images: for each page a small "preview" URL and a
+    sharp "full" URL. Both carry the file's version (v), so the browser may
+    keep them for good.
+    """
+    pdf_path, abstract_page, _ = get_thesis_file(thesis_id)
+    version = abstract_cache_key(pdf_path)[:12]
+    pages = []
+    for page in get_abstract_pages(pdf_path, abstract_page):
+        pages.append({
+            "page": page,
+            "preview": url_for('thesis_page', thesis_id=thesis_id, page=page, scale=PAGE_PREVIEW_SCALE, v=version),
+            "full": url_for('thesis_page', thesis_id=thesis_id, page=page, scale=PAGE_FULL_SCALE, v=version),
+        })
+    return jsonify({"pages": pages})
+
+
+@app.route('/thesis/<int:thesis_id>/page/<int:page>.webp')
+def thesis_page(thesis_id, page):
+    """
+    One page of a thesis (0-based) as WebP. scale is one of PAGE_SCALES (1.0
+    is 72 dpi). Rendered on the first request and served from RENDER_CACHE
+    after that.
+    """
+    try:
+        scale = float(request.args.get('scale', PAGE_FULL_SCALE))
+    except ValueError:
+        abort(400)
+    if scale not in PAGE_SCALES:
+        abort(400)
+
+    pdf_path, _, _ = get_thesis_file(thesis_id)
+    key = abstract_cache_key(pdf_path)
+    name = f"{key}-p{page}-x{scale:g}.webp"
+    path = RENDER_CACHE.get(name)
+    if not path:
+        data = render_page_webp(pdf_path, page, scale)
+        if data is None:
+            abort(404)
+        path = RENDER_CACHE.put(name, data)
+
+    # A URL with the current version never changes; without it, revalidate by ETag each time
+    immutable = request.args.get('v') == key[:12]
+    response = send_file(path, mimetype="image/webp", etag=name[:-5], conditional=True,
+                         max_age=31536000 if immutable else 0)
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
+
+
+@app.route('/thesis/<int:thesis_id>/pdf')
+def thesis_pdf(thesis_id):
+    """
+    The thesis PDF, named after its title. Range requests get 206 Partial
+    Content, so a browser's PDF viewer can fetch the pages it shows instead
+    of downloading the whole file first. Conditional GETs (ETag /
+    Last-Modified) answer 304 when the browser's copy is current.
+    """
+    pdf_path, _, download_name = get_thesis_file(thesis_id)
+    return send_file(pdf_path, mimetype="application/pdf", download_name=download_name,
+                     conditional=True, etag=True, max_age=0)
 
 
 # --- Run App ---
@@ -0,0 +1,58 @@
+import sqlite3
+import os
+import argparse
+
+from migrations import DB_PATH, migrate
+from pdf_utils import abstract_page_for_db
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def backfill_abstract_pages(db_path=DB_PATH, batch_size=100, rescan=False):
+    """
+    Scans every thesis PDF whose abstract page is unknown and stores the result.
+    With rescan=True, every row is scanned again.
+    """
+    migrate(db_path)
+    conn = sqlite3.connect(db_path, timeout=10.0)
+    try:
+        where = "" if rescan else " WHERE abstract_page IS NULL"
+        rows = conn.execute(f"SELECT thesis_id, file_path FROM theses{where}").fetchall()
+
+        updates = []
+        scanned = missing = 0
+        for thesis_id, file_path in rows:
+            full_path = os.path.join(PROJECT_DIR, file_path)
+            if not os.path.exists(full_path):
+                print(f"❌ File not found for thesis {thesis_id}: {file_path}")
+                missing += 1
+                continue
+            try:
+                updates.append((abstract_page_for_db(full_path), thesis_id))
+                scanned += 1
+            except Exception as e:
+                print(f"❌ Could not scan thesis {thesis_id}: {e}")
+                continue
+
+            if len(updates) >= batch_size:
+                conn.executemany("UPDATE theses SET abstract_page = ? WHERE thesis_id = ?", updates)
+                conn.commit()
+                updates.clear()
+
+        if updates:
+            conn.executemany("UPDATE theses SET abstract_page = ? WHERE thesis_id = ?", updates)
+            conn.commit()
+
+        print(f"✅ Scanned {scanned} of {len(rows)} theses ({missing} missing files).")
+        return scanned
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Store the abstract page index of every thesis PDF.")
+    parser.add_argument("--db", default=DB_PATH, help="Path to thesis_repository.db")
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows to update per transaction")
+    parser.add_argument("--rescan", action="store_true", help="Scan rows that already have a value")
+    args = parser.parse_args()
+    backfill_abstract_pages(args.db, args.batch_size, args.rescan)
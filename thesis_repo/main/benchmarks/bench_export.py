@@ -0,0 +1,87 @@
+"""
+Compares exporting every PDF the old way (one shutil.copy2 after another,
+probing the disk for a free name each time) with export_engine.export_pdfs
+into a folder (thread pool) and into a ZIP or TAR archive, on synthetic PDFs.
+
+Everything happens in a temporary folder; thesis_files is never touched. The
+OS file cache stays warm between runs, so this mostly shows per-file
+overhead. Usage (from thesis_repo/main):
+
+    python benchmarks/bench_export.py --files 2000 --size-kb 500
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pdf_store
+import export_engine
+
+COURSES = ["BSCS", "BSOA", "BSBA", "BSED", "BEED", "ABREED"]
+
+
+def make_records(work_dir, count, size_kb):
+    """Stored PDFs of random bytes; every tenth title repeats to exercise the name clash handling."""
+    pdf_store.PROJECT_DIR = work_dir
+    pdf_store.THESIS_FILES_DIR = os.path.join(work_dir, "thesis_files")
+    pdf_store.STORE_DIR = os.path.join(pdf_store.THESIS_FILES_DIR, "store")
+    records = []
+    for thesis_id in range(1, count + 1):
+        content_hash = f"{thesis_id:064x}"
+        path = pdf_store.object_path(content_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(os.urandom(size_kb * 1024))
+        title = "Repeated Title" if thesis_id % 10 == 0 else f"Thesis Number {thesis_id}"
+        records.append((thesis_id, title, "Author", COURSES[thesis_id % len(COURSES)], 2020,
+                        pdf_store.relative_path(path)))
+    return records
+
+
+def old_export(records, export_folder):
+    """What delete.export_all_pdfs used to do, on the Tk thread."""
+    for thesis_id, title, authors, course, year, file_path in records:
+        course_folder = os.path.join(export_folder, course)
+        os.makedirs(course_folder, exist_ok=True)
+        filename = pdf_store.export_filename(title, file_path)
+        dest_path = os.path.join(course_folder, filename)
+        if os.path.exists(dest_path):
+            base, ext = os.path.splitext(filename)
+            counter = 1
+            while os.path.exists(dest_path):
+                dest_path = os.path.join(course_folder, f"{base}_{counter}{ext}")
+                counter += 1
+        shutil.copy2(pdf_store.absolute_path(file_path), dest_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark exporting all PDFs.")
+    parser.add_argument("--files", type=int, default=2000, help="Number of synthetic PDFs")
+    parser.add_argument("--size-kb", type=int, default=500, help="Size of each PDF")
+    parser.add_argument("--workers", type=int, default=export_engine.DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        records = make_records(work_dir, args.files, args.size_kb)
+        total_mb = args.files * args.size_kb / 1024
+        variants = [
+            ("serial copy2 (old)", lambda dest: old_export(records, dest)),
+            (f"folder, {args.workers} threads + manifest",
+             lambda dest: export_engine.export_pdfs(records, dest, "folder", workers=args.workers)),
+            ("zip, stored + manifest", lambda dest: export_engine.export_pdfs(records, dest + ".zip", "zip")),
+            ("tar + manifest", lambda dest: export_engine.export_pdfs(records, dest + ".tar", "tar")),
+        ]
+        print(f"{args.files} PDFs, {total_mb:.0f} MB\n")
+        print(f"{'variant':<34} {'time':>9} {'MB/s':>9}")
+        for number, (name, export) in enumerate(variants):
+            start = time.perf_counter()
+            export(os.path.join(work_dir, f"export_{number}"))
+            elapsed = time.perf_counter() - start
+            print(f"{name:<34} {elapsed:8.2f}s {total_mb / elapsed:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
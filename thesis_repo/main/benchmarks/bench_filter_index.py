@@ -0,0 +1,75 @@
+"""
+Measures per-keystroke filtering of the update screen's list: the plain loop
+over every row against FilterIndex, on synthetic titles.
+
+Each query is typed one character at a time, as in the search box, and the
+slowest keystroke is reported. Usage (from thesis_repo/main):
+
+    python benchmarks/bench_filter_index.py --rows 50000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from filter_index import FilterIndex
+
+WORDS = (
+    "analysis design development implementation evaluation of a the for and in on "
+    "student information management system online web based mobile application "
+    "barangay health records learning performance using deep neural network "
+    "inventory enrollment attendance monitoring study effectiveness teachers"
+).split()
+COURSES = ["BSCS", "BSOA", "BSBA", "BSED", "BEED", "ABREED"]
+QUERIES = ["management", "online enrollment", "2019", "bscs", "e-le", "xyz"]
+
+
+def make_rows(count, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for thesis_id in range(1, count + 1):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))).title()
+        rows.append((thesis_id, title, rng.choice(COURSES), rng.randint(2010, 2025), ""))
+    return rows
+
+
+def plain_filter(rows, search_text):
+    """The loop filter_treeview used to run on every keystroke."""
+    matches = []
+    for thesis_id, title, course, year, _ in rows:
+        if search_text in title.lower() or search_text in course.lower() or search_text in str(year):
+            matches.append(thesis_id)
+    return matches
+
+
+def slowest_keystroke(filter_text, query):
+    slowest = 0.0
+    for end in range(1, len(query) + 1):
+        start = time.perf_counter()
+        filter_text(query[:end])
+        slowest = max(slowest, time.perf_counter() - start)
+    return slowest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark list filtering per keystroke.")
+    parser.add_argument("--rows", type=int, default=50000, help="Number of synthetic theses")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    start = time.perf_counter()
+    index = FilterIndex(rows)
+    print(f"index build for {args.rows} rows: {time.perf_counter() - start:.3f}s")
+
+    print(f"{'query':<20} {'plain loop':>12} {'FilterIndex':>12}")
+    for query in QUERIES:
+        assert index.filter(query) == plain_filter(rows, query), query
+        plain = slowest_keystroke(lambda text: plain_filter(rows, text), query)
+        indexed = slowest_keystroke(index.filter, query)
+        print(f"{query:<20} {plain * 1000:10.1f}ms {indexed * 1000:10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Compares storing a large PDF the old way (hash the source, then copy it:
+two full reads) with pdf_store.ingest_pdf (hash while copying: one read),
+optionally followed by watermarking the stored copy.
+
+Without a PDF argument a synthetic one is generated (pages of random,
+incompressible image data, like a scanned manuscript). Files are stored in
+a temporary folder, never in thesis_files. The OS file cache stays warm
+between runs, so the numbers show CPU and memory-copy cost; use a file
+larger than RAM for cold-disk numbers. Usage (from thesis_repo/main):
+
+    python benchmarks/bench_ingest.py --size-mb 150 --runs 3
+    python benchmarks/bench_ingest.py path/to/scan.pdf --watermark
+"""
+import os
+import sys
+import math
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pdf_store
+
+
+def write_synthetic_pdf(path, size_mb, pages=4):
+    """Writes a valid PDF of about size_mb MB: one uncompressed grayscale image per page."""
+    side = int(math.sqrt(size_mb * 1024 * 1024 / pages))
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None]  # the page tree is filled in below
+    page_refs = []
+    for _ in range(pages):
+        image_number = len(objects) + 1
+        image = os.urandom(side * side)
+        objects.append(
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+            b"/BitsPerComponent 8 /Length %d >>\nstream\n" % (side, side, len(image)) + image + b"\nendstream"
+        )
+        content = b"q 595 0 0 842 0 0 cm /Im0 Do Q"
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /XObject << /Im0 %d 0 R >> >> >>" % (image_number + 1, image_number)
+        )
+        page_refs.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(page_refs), pages)
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset))
+
+
+def old_store(source_path, prepare):
+    """What the save paths used to do: hash the source, then copy it, then watermark the copy."""
+    digest = hashlib.sha256()
+    with open(source_path, "rb") as f:
+        for chunk in iter(lambda: f.read(pdf_store.COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    target_path = pdf_store.object_path(digest.hexdigest())
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    shutil.copy2(source_path, target_path)
+    if prepare:
+        prepare(target_path)
+    return target_path
+
+
+def new_store(source_path, prepare):
+    return pdf_store.ingest_pdf(source_path, prepare=prepare)[1]
+
+
+def time_variant(store, source_path, prepare, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        target_path = store(source_path, prepare)
+        times.append(time.perf_counter() - start)
+        os.remove(target_path)  # so the next run stores it again instead of finding a duplicate
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming PDF ingest stage.")
+    parser.add_argument("pdf", nargs="?", help="PDF to store (default: generate a synthetic one)")
+    parser.add_argument("--size-mb", type=int, default=150, help="Size of the synthetic PDF")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per variant (median is reported)")
+    parser.add_argument("--watermark", action="store_true", help="Also watermark the stored copy (needs PyMuPDF)")
+    args = parser.parse_args()
+
+    prepare = None
+    if args.watermark:
+        from watermark import add_watermark
+        prepare = lambda path: add_watermark(path, path)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        pdf_store.STORE_DIR = os.path.join(work_dir, "store")
+        source_path = args.pdf
+        if not source_path:
+            source_path = os.path.join(work_dir, "synthetic.pdf")
+            write_synthetic_pdf(source_path, args.size_mb)
+        size_mb = os.path.getsize(source_path) / (1024 * 1024)
+
+        print(f"{size_mb:.0f} MB PDF, {args.runs} runs per variant{', watermarked' if prepare else ''}\n")
+        print(f"{'variant':<34} {'median':>9} {'MB/s':>9}")
+        for name, store in (("hash, then copy (old)", old_store), ("hash while copying (ingest_pdf)", new_store)):
+            os.remove(store(source_path, prepare))  # warm-up, also fills the OS file cache
+            median = time_variant(store, source_path, prepare, args.runs)
+            print(f"{name:<34} {median:8.3f}s {size_mb / median:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Measures cold start time of the desktop app and the Flask server.
+
+Each measurement runs in a fresh Python process, so nothing is cached between
+runs except the OS file cache. Usage (from thesis_repo/main):
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import os
+import sys
+import statistics
+import subprocess
+import argparse
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What a user waits for before the first window (or the first request) can be served
+TARGETS = {
+    "desktop (import main)": "import main",
+    "web (import app)": "import app",
+    "keyword model load (first use)": "import keywords\nassert keywords.get_kw_model(), 'KeyBERT unavailable'",
+}
+
+TIMER = (
+    "import time; _start = time.perf_counter()\n"
+    "{statement}\n"
+    "print(time.perf_counter() - _start)"
+)
+
+
+def time_statement(statement):
+    result = subprocess.run(
+        [sys.executable, "-c", TIMER.format(statement=statement)],
+        cwd=MAIN_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "failed")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start time.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per target")
+    args = parser.parse_args()
+
+    print(f"{'target':<34} {'median':>9} {'min':>9} {'max':>9}")
+    for name, statement in TARGETS.items():
+        try:
+            times = [time_statement(statement) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{name:<34} skipped: {e}")
+            continue
+        print(f"{name:<34} {statistics.median(times):8.3f}s {min(times):8.3f}s {max(times):8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Compares title/authors/keywords search through the trigram index (see
+trigram_search.py) with the LIKE '%...%' scan it replaces, on throwaway
+databases of synthetic theses.
+
+Each size gets its own temporary database built by migrations.migrate(), so
+the real thesis_repository.db is never touched. Usage (from thesis_repo/main):
+
+    python benchmarks/bench_trigram_search.py --sizes 1000 10000 100000
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from migrations import migrate
+from trigram_search import TRIGRAM_TABLE, VOCABULARY, has_trigram_index, phrase, fuzzy_query
+
+COMMON_WORDS = (
+    "analysis design development implementation evaluation of the for and in on "
+    "student information management system online web based mobile application "
+    "barangay health records learning performance catechetical instruction youth "
+    "e-commerce adoption inventory enrollment attendance monitoring effectiveness"
+).split()
+SYLLABLES = "ka ri to pan sel mo nu ter gra vi lo cen dis tri ba ne sto quen fa li".split()
+NAMES = "santos reyes cruz bautista garcia mendoza dela torre villanueva ramos".split()
+
+# (label, text): substrings inside words, a miss, and typos for the fuzzy search
+SUBSTRING_QUERIES = [("inside a word", "chetic"), ("hyphenated", "e-commerce"), ("no match", "xylophone")]
+FUZZY_QUERIES = [("one typo", "catechetcal"), ("two typos", "enrolment monitring")]
+
+
+def make_vocabulary(rng, size=5000):
+    """Common words first, then made-up ones; picked with Zipf-like weights like real titles."""
+    words = list(COMMON_WORDS)
+    while len(words) < size:
+        words.append("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    return words, weights
+
+
+def build_database(path, count, seed=0):
+    migrate(path)
+    rng = random.Random(seed)
+    words, weights = make_vocabulary(rng)
+    rows = []
+    for _ in range(count):
+        title = " ".join(rng.choices(words, weights, k=rng.randint(4, 12))).title()
+        authors = ", ".join(rng.sample(NAMES, 2)).title()
+        keywords = ", ".join(rng.choices(words, weights, k=3))
+        rows.append((title, authors, "BSCS", rng.randint(2010, 2025), keywords, "thesis_files/x.pdf"))
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO theses (title, authors, course, year, keywords, file_path) VALUES (?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.commit()
+    return conn
+
+
+def time_query(conn, sql, params, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = conn.execute(sql, params).fetchall()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), len(rows)
+
+
+def time_fuzzy(conn, text, runs):
+    """Spelling lookup plus the ranked full-text query, as api_search runs them."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        match = fuzzy_query(conn, text)
+        rows = []
+        if match:
+            rows = conn.execute(
+                "SELECT rowid FROM theses_fts WHERE theses_fts MATCH ? ORDER BY bm25(theses_fts) LIMIT 50",
+                [match]
+            ).fetchall()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), len(rows)
+
+
+def like_query(text):
+    like = f"%{text}%"
+    return ("SELECT thesis_id FROM theses WHERE title LIKE ? OR keywords LIKE ? OR authors LIKE ?",
+            [like, like, like])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark trigram search against LIKE.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--runs", type=int, default=5, help="Runs per query (median is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in args.sizes:
+            conn = build_database(os.path.join(work_dir, f"bench_{size}.db"), size)
+            if not has_trigram_index(conn):
+                print(f"SQLite {sqlite3.sqlite_version} has no trigram tokenizer; nothing to compare.")
+                return
+            print(f"\n{size} theses")
+            print(f"{'query':<32} {'LIKE scan':>14} {'trigram':>14}")
+            for label, text in SUBSTRING_QUERIES:
+                like_time, like_count = time_query(conn, *like_query(text), args.runs)
+                trigram_sql = f"SELECT rowid FROM {TRIGRAM_TABLE} WHERE {TRIGRAM_TABLE} MATCH ?"
+                trigram_time, trigram_count = time_query(conn, trigram_sql, [phrase(text)], args.runs)
+                assert like_count == trigram_count, (text, like_count, trigram_count)
+                print(f"{label + ' (' + text + ')':<32} {like_time * 1000:9.2f}ms    {trigram_time * 1000:9.2f}ms")
+            # The word list is read once, then again only after the table changes
+            start = time.perf_counter()
+            VOCABULARY.similar_words(conn, "warmup")
+            print(f"{'fuzzy word list (first search)':<32} {'-':>14} {(time.perf_counter() - start) * 1000:9.2f}ms")
+            for label, text in FUZZY_QUERIES:
+                like_time, _ = time_query(conn, *like_query(text), args.runs)
+                fuzzy_time, matches = time_fuzzy(conn, text, args.runs)
+                print(f"{label + ' (' + text + ')':<32} {like_time * 1000:9.2f}ms    {fuzzy_time * 1000:9.2f}ms"
+                      f"  fuzzy, top {matches} (LIKE finds none)")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares watermarking throughput (pages/sec) of the two engines in watermark.py.
+
+"legacy" decodes the logo and redraws the overlay for every file, like the old
+per-upload code did; "pypdf2" and "pymupdf" reuse both from watermark.py's
+caches. Usage (from thesis_repo/main):
+
+    python benchmarks/bench_watermark.py path/to/thesis.pdf --runs 5
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+import watermark
+
+
+def time_engine(pdf_path, engine, clear_caches, work_dir):
+    target_path = os.path.join(work_dir, f"{engine}.pdf")
+    shutil.copy2(pdf_path, target_path)
+    if clear_caches:
+        watermark.build_overlay.cache_clear()
+        watermark._logo_reader.cache_clear()
+    start = time.perf_counter()
+    watermark.add_watermark(target_path, target_path, engine=engine)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF watermarking engines.")
+    parser.add_argument("pdf", help="PDF to watermark (it is copied, never modified)")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per engine")
+    args = parser.parse_args()
+
+    with fitz.open(args.pdf) as doc:
+        page_count = len(doc)
+
+    variants = [("legacy", "pypdf2", True), ("pypdf2", "pypdf2", False), ("pymupdf", "pymupdf", False)]
+    print(f"{page_count} pages, {args.runs} runs per engine\n")
+    print(f"{'engine':<10} {'median':>9} {'pages/s':>10}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, engine, clear_caches in variants:
+            time_engine(args.pdf, engine, False, work_dir)  # warm-up
+            times = [time_engine(args.pdf, engine, clear_caches, work_dir) for _ in range(args.runs)]
+            median = statistics.median(times)
+            print(f"{name:<10} {median:8.3f}s {page_count / median:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
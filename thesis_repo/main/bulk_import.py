@@ -0,0 +1,271 @@
+import sqlite3
+import os
+import time
+import argparse
+from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from migrations import DB_PATH, migrate
+from pdf_utils import extract_pdf_metadata, NO_ABSTRACT_PAGE
+from watermark import add_watermark, WATERMARK_VERSION
+from keywords import extract_keywords_batch
+import pdf_store
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGO_PATH = os.path.join(PROJECT_DIR, "image.png")
+COURSES = ["BSCS", "BSOA", "BSBA", "BSED", "BEED", "ABREED"]
+
+
+class StageTimer:
+    """Adds up wall-clock time and file counts per pipeline stage."""
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.files = defaultdict(int)
+
+    @contextmanager
+    def stage(self, name, file_count):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+            self.files[name] += file_count
+
+    def summary(self, name):
+        seconds = self.seconds[name]
+        files = self.files[name]
+        rate = files / seconds if seconds > 0 else 0.0
+        return f"{name:>9}: {files:5d} files in {seconds:7.2f}s ({rate:7.1f} files/s)"
+
+
+# ---------------- Pipeline stages ---------------- #
+def find_pdfs(folder):
+    """Returns every PDF under folder, in a stable order."""
+    pdfs = []
+    for dirpath, _, filenames in os.walk(folder):
+        for filename in filenames:
+            if filename.lower().endswith(".pdf"):
+                pdfs.append(os.path.abspath(os.path.join(dirpath, filename)))
+    return sorted(pdfs)
+
+
+def infer_course(pdf_path, root, default_course=None):
+    """
+    Uses the nearest folder between the PDF and root that is named after a
+    course (e.g. root/bscs/x.pdf), else default_course.
+    """
+    root = os.path.abspath(root)
+    folder = os.path.dirname(pdf_path)
+    while len(folder) >= len(root):
+        name = os.path.basename(folder).upper()
+        if name in COURSES:
+            return name
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            break
+        folder = parent
+    return default_course
+
+
+def _extract_one(pdf_path):
+    """Worker: reads metadata from one PDF. Runs in a separate process."""
+    try:
+        return pdf_path, extract_pdf_metadata(pdf_path), None
+    except Exception as e:
+        return pdf_path, None, str(e)
+
+
+def _store_one(args):
+    """
+    Worker: stores one PDF in thesis_files/store and watermarks it, unless
+    identical contents are stored already. Runs in a separate process.
+    Returns (target_path, content_hash, watermark_version, error), where
+    watermark_version is None unless this call stamped the file.
+    """
+    source_path, watermark = args
+    stamped = []
+
+    def prepare(path):
+        if not watermark:
+            return
+        try:
+            add_watermark(path, path, logo_path=LOGO_PATH)
+            stamped.append(WATERMARK_VERSION)
+        except Exception as e:
+            # Same as the upload form: keep the unwatermarked copy
+            print(f"Watermarking failed for {source_path}: {e}")
+
+    try:
+        content_hash, target_path = pdf_store.ingest_pdf(source_path, prepare=prepare)
+        return target_path, content_hash, stamped[0] if stamped else None, None
+    except Exception as e:
+        return None, None, None, f"copy failed: {e}"
+
+
+# ---------------- Import ---------------- #
+def load_imported(conn):
+    """Returns {source_path: (size, mtime)} for PDFs saved by earlier runs."""
+    rows = conn.execute("SELECT source_path, source_size, source_mtime FROM bulk_imports")
+    return {path: (size, mtime) for path, size, mtime in rows}
+
+
+def release_stored(conn, stored):
+    """Deletes the files _store_one stored for a batch that wasn't saved, unless a saved thesis uses them."""
+    for target_path, _, _, error in stored:
+        if error:
+            continue
+        try:
+            pdf_store.release_file(conn, pdf_store.relative_path(target_path))
+        except OSError as e:
+            print(f"Could not remove {target_path}: {e}")
+
+
+def bulk_import(folder, course=None, year=None, workers=None, batch_size=64,
+                watermark=True, keywords=True, db_path=DB_PATH):
+    """
+    Imports every PDF under folder. Files are processed in batches: metadata is
+    extracted and PDFs are watermarked in parallel processes, keywords come from
+    one KeyBERT call per batch, and each batch is saved in a single transaction.
+    Re-running after an interruption skips files that were already saved.
+    """
+    migrate(db_path)
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+
+    imported = load_imported(conn)
+    pending = []
+    already_imported = 0
+    for pdf_path in find_pdfs(folder):
+        stat = os.stat(pdf_path)
+        if imported.get(pdf_path) == (stat.st_size, stat.st_mtime):
+            already_imported += 1
+            continue
+        pending.append(pdf_path)
+
+    print(f"📂 {len(pending)} PDFs to import ({already_imported} already imported).")
+    if not pending:
+        conn.close()
+        return 0
+
+    worker_count = workers or os.cpu_count()
+    timer = StageTimer()
+    saved = skipped = 0
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=worker_count) as pool:
+        for batch_start in range(0, len(pending), batch_size):
+            batch = pending[batch_start:batch_start + batch_size]
+
+            # 1. Metadata (authors, year, title, abstract) in parallel
+            with timer.stage("extract", len(batch)):
+                chunksize = max(1, len(batch) // (4 * worker_count))
+                extracted = list(pool.map(_extract_one, batch, chunksize=chunksize))
+
+            records = []
+            for pdf_path, metadata, error in extracted:
+                if error:
+                    print(f"❌ Could not read {pdf_path}: {error}")
+                    skipped += 1
+                    continue
+                record_course = infer_course(pdf_path, folder, course)
+                record_year = metadata["year"] or year
+                if not record_course or not record_year:
+                    missing = "course" if not record_course else "year"
+                    print(f"❌ Skipping {pdf_path}: no {missing} found (use --{missing}).")
+                    skipped += 1
+                    continue
+                metadata.update(source_path=pdf_path, course=record_course, year=int(record_year))
+                records.append(metadata)
+
+            # 2. Keywords: one batched model call for the whole batch
+            with timer.stage("keyword", len(records)):
+                if keywords:
+                    texts = [r["abstract_text"] or r["title"] for r in records]
+                    for record, record_keywords in zip(records, extract_keywords_batch(texts, db_path=db_path)):
+                        record["keywords"] = record_keywords
+                else:
+                    for record in records:
+                        record["keywords"] = ""
+
+            # 3. Copy + watermark in parallel (identical PDFs are stored once)
+            futures = [pool.submit(_store_one, (record["source_path"], watermark)) for record in records]
+            try:
+                with timer.stage("watermark", len(records)):
+                    stored = [future.result() for future in futures]
+
+                # 4. One transaction per batch, recording progress for resuming. It holds
+                #    the write lock from the start, so no stored file can be released meanwhile
+                with timer.stage("db", len(records)):
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        for record, (target_path, content_hash, watermark_version, error) in zip(records, stored):
+                            if not error:
+                                try:
+                                    pdf_store.claim_file(pdf_store.relative_path(target_path))
+                                except pdf_store.StoredFileMissing as e:
+                                    error = f"{e} Run the import again to add it."
+                            if error:
+                                print(f"❌ Could not store {record['source_path']}: {error}")
+                                skipped += 1
+                                continue
+                            abstract_page = record["abstract_page"]
+                            if watermark_version is None:
+                                # Identical contents stored before were stamped by whoever stored them
+                                watermark_version = pdf_store.known_watermark_version(conn, content_hash)
+                            cursor = conn.execute('''
+                                INSERT INTO theses (title, authors, course, year, keywords, file_path, abstract_page, content_hash, watermark_version)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                            ''', (record["title"], record["authors"], record["course"], record["year"],
+                                  record["keywords"], pdf_store.relative_path(target_path),
+                                  NO_ABSTRACT_PAGE if abstract_page is None else abstract_page, content_hash,
+                                  watermark_version))
+                            stat = os.stat(record["source_path"])
+                            conn.execute('''
+                                INSERT OR REPLACE INTO bulk_imports (source_path, source_size, source_mtime, thesis_id)
+                                VALUES (?, ?, ?, ?)
+                            ''', (record["source_path"], stat.st_size, stat.st_mtime, cursor.lastrowid))
+                            saved += 1
+                        conn.commit()
+                    except BaseException:
+                        conn.rollback()
+                        raise
+            except BaseException:
+                # Interrupted (Ctrl+C) or the transaction failed: nothing of this batch
+                # was saved, so don't leave its freshly stored files behind
+                for future in futures:
+                    future.cancel()
+                wait(futures)  # files still being stored are released too
+                release_stored(conn, [future.result() for future in futures
+                                      if not future.cancelled() and future.exception() is None])
+                raise
+
+            done = min(batch_start + batch_size, len(pending))
+            elapsed = time.perf_counter() - started
+            print(f"✅ {done}/{len(pending)} files processed, {saved} saved ({done / elapsed:.1f} files/s overall)")
+
+    conn.close()
+
+    print("\nPer-stage throughput:")
+    for name in ("extract", "keyword", "watermark", "db"):
+        print(timer.summary(name))
+    print(f"\n🎉 Imported {saved} theses, skipped {skipped}.")
+    return saved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a folder tree of thesis PDFs into the repository.")
+    parser.add_argument("folder", help="Folder to scan for PDFs (searched recursively)")
+    parser.add_argument("--course", choices=COURSES,
+                        help="Course for PDFs that aren't inside a folder named after a course")
+    parser.add_argument("--year", type=int, help="Year for PDFs whose first page has no date")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Files per batch / transaction")
+    parser.add_argument("--no-watermark", action="store_true", help="Copy PDFs without watermarking them")
+    parser.add_argument("--no-keywords", action="store_true", help="Skip KeyBERT keyword extraction")
+    parser.add_argument("--db", default=DB_PATH, help="Path to thesis_repository.db")
+    args = parser.parse_args()
+
+    bulk_import(args.folder, course=args.course, year=args.year, workers=args.workers,
+                batch_size=args.batch_size, watermark=not args.no_watermark,
+                keywords=not args.no_keywords, db_path=args.db)
@@ -0,0 +1,72 @@
+import queue
+import sqlite3
+
+from flask import g, current_app
+
+
+class ConnectionPool:
+    """
+    Keeps open SQLite connections around so requests don't pay for connecting
+    (and re-parsing their SQL) every time.
+
+    A connection is handed to one thread at a time and returned when that
+    thread is done with it. Each connection keeps its own cache of prepared
+    statements, so queries that run often are only parsed once per connection.
+    """
+    def __init__(self, db_path, max_idle=8, cached_statements=256, timeout=10.0):
+        self.db_path = db_path
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+
+    def _connect(self):
+        # Connections move between the threads of the web server, but only
+        # one thread uses a given connection at a time
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.row_factory = sqlite3.Row
+        # WAL lets readers carry on while the desktop app writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def acquire(self):
+        try:
+            # Most recently used first, its statement cache is warmest
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def init_app(app, db_path):
+    """Attaches a connection pool to a Flask app; get_db() then works inside any request."""
+    app.extensions["db_pool"] = ConnectionPool(db_path)
+    app.teardown_appcontext(_release_db)
+
+
+def get_db():
+    """Returns this app context's connection, taking one from the pool on first use."""
+    if "db" not in g:
+        g.db = current_app.extensions["db_pool"].acquire()
+    return g.db
+
+
+def _release_db(exception=None):
+    conn = g.pop("db", None)
+    if conn is not None:
+        current_app.extensions["db_pool"].release(conn)
@@ -2,11 +2,16 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import sqlite3
 import os
-import shutil
-from PIL import Image, ImageTk
-import fitz  # PyMuPDF
+from PIL import ImageTk
+from thumbnails import get_thumbnail
+from migrations import migrate
+from virtual_tree import VirtualTreeview, SELECT_EVENT, sqlite_row_source
+import export_engine
+from ingest_queue import get_ingest_queue
+import trash
 
 db_path = os.path.join(os.path.dirname(__file__), "thesis_repository.db")
+TRASH_RETENTION_DAYS = trash.TRASH_RETENTION_SECONDS // 86400
 
 
 def get_all_theses():
@@ -23,59 +28,64 @@ def get_all_theses():
         return []
 
 
-def delete_selected_thesis(tree, preview_label, on_success=None, on_refresh=None):
-    """Deletes the selected thesis entry and its PDF file."""
-    selected = tree.selection()
+def delete_batch(thesis_ids, preview_label, on_success=None, on_refresh=None, on_deleted=None):
+    """
+    Moves theses and their PDF files to the trash in one transaction (see
+    trash.py). on_deleted(batch_id, count) is called so the screen can offer
+    Undo; without it a confirmation is shown instead.
+    """
+    try:
+        conn = sqlite3.connect(db_path, timeout=10.0)
+        try:
+            batch_id = trash.delete_theses(conn, thesis_ids)
+        finally:
+            conn.close()
+    except Exception as e:
+        messagebox.showerror("Delete Error", f"Failed to delete theses:\n{e}")
+        return
+
+    # Clear preview
+    preview_label.config(image='')
+    preview_label.image = None
+
+    if batch_id is not None:
+        if on_deleted:
+            on_deleted(batch_id, len(thesis_ids))
+        else:
+            messagebox.showinfo("Success", f"{len(thesis_ids)} thesis entries moved to the trash.")
+
+    # Refresh the delete UI list
+    if on_success:
+        on_success()
+
+    # Refresh the main UI
+    if on_refresh:
+        on_refresh()
+
+
+def delete_selected_thesis(results, preview_label, on_success=None, on_refresh=None, on_deleted=None):
+    """Deletes the selected theses (one or many) and their PDF files."""
+    selected = results.selected_values()
     if not selected:
         messagebox.showwarning("No Selection", "Please select a thesis to delete.")
         return
-    
-    item = tree.item(selected[0])
-    thesis_id = item['values'][0]
-    title = item['values'][1]
-    file_path = item['values'][5]
-    
-    confirm = messagebox.askyesno(
-        "Confirm Delete",
-        f"Are you sure you want to delete this thesis?\n\nTitle: {title}\n\nThis will permanently remove the entry and the PDF file."
-    )
-    
-    if not confirm:
+
+    restore_note = f"It can be restored with Undo for {TRASH_RETENTION_DAYS} days."
+    if len(selected) == 1:
+        title = selected[0][1][1]
+        prompt = f"Are you sure you want to delete this thesis?\n\nTitle: {title}\n\n{restore_note}"
+    else:
+        titles = "\n".join(f"• {values[1]}" for _, values in selected[:5])
+        more = f"\n... and {len(selected) - 5} more" if len(selected) > 5 else ""
+        prompt = f"Are you sure you want to delete these {len(selected)} theses?\n\n{titles}{more}\n\n{restore_note}"
+
+    if not messagebox.askyesno("Confirm Delete", prompt):
         return
-    
-    try:
-        # Delete from database
-        conn = sqlite3.connect(db_path)
-        c = conn.cursor()
-        c.execute('DELETE FROM theses WHERE thesis_id = ?', (thesis_id,))
-        conn.commit()
-        conn.close()
-        
-        # Delete PDF file
-        project_dir = os.path.dirname(os.path.abspath(__file__))
-        full_path = os.path.join(project_dir, file_path)
-        if os.path.exists(full_path):
-            os.remove(full_path)
-        
-        messagebox.showinfo("Success", "Thesis entry and PDF file deleted successfully!")
-        
-        # Clear preview
-        preview_label.config(image='')
-        preview_label.image = None
-        
-        # Refresh the delete UI list
-        if on_success:
-            on_success()
-        
-        # Refresh the main UI
-        if on_refresh:
-            on_refresh()
-            
-    except Exception as e:
-        messagebox.showerror("Delete Error", f"Failed to delete thesis:\n{e}")
+
+    delete_batch([thesis_id for thesis_id, _ in selected], preview_label, on_success, on_refresh, on_deleted)
 
 
-def delete_all_theses(tree, preview_label, on_success=None, on_refresh=None):
+def delete_all_theses(results, preview_label, on_success=None, on_refresh=None, on_deleted=None):
     """Deletes all thesis entries and their PDF files."""
     records = get_all_theses()
     
@@ -85,7 +95,7 @@ def delete_all_theses(tree, preview_label, on_success=None, on_refresh=None):
     
     confirm = messagebox.askyesno(
         "Confirm Delete All",
-        f"⚠️ WARNING ⚠️\n\nYou are about to delete ALL {len(records)} thesis entries and their PDF files.\n\nThis action CANNOT be undone!\n\nAre you absolutely sure?"
+        f"⚠️ WARNING ⚠️\n\nYou are about to delete ALL {len(records)} thesis entries and their PDF files.\n\nThey stay in the trash for {TRASH_RETENTION_DAYS} days and are then removed for good.\n\nAre you absolutely sure?"
     )
     
     if not confirm:
@@ -94,115 +104,153 @@ def delete_all_theses(tree, preview_label, on_success=None, on_refresh=None):
     # Double confirmation for safety
     confirm2 = messagebox.askyesno(
         "Final Confirmation",
-        "This is your last chance to cancel.\n\nDelete ALL thesis entries permanently?"
+        "This is your last chance to cancel.\n\nDelete ALL thesis entries?"
     )
     
     if not confirm2:
         return
-    
-    try:
-        project_dir = os.path.dirname(os.path.abspath(__file__))
-        deleted_count = 0
-        
-        # Delete all PDF files
-        for record in records:
-            file_path = record[5]
-            full_path = os.path.join(project_dir, file_path)
-            if os.path.exists(full_path):
-                os.remove(full_path)
-                deleted_count += 1
-        
-        # Delete all database entries
-        conn = sqlite3.connect(db_path)
-        c = conn.cursor()
-        c.execute('DELETE FROM theses')
-        conn.commit()
-        conn.close()
-        
-        messagebox.showinfo("Success", f"All {deleted_count} thesis entries and PDF files deleted successfully!")
-        
-        # Clear preview
-        preview_label.config(image='')
-        preview_label.image = None
-        
-        # Refresh the delete UI list
-        if on_success:
-            on_success()
-        
-        # Refresh the main UI
-        if on_refresh:
-            on_refresh()
-            
-    except Exception as e:
-        messagebox.showerror("Delete Error", f"Failed to delete all theses:\n{e}")
+
+    delete_batch([record[0] for record in records], preview_label, on_success, on_refresh, on_deleted)
+
+
+# ---------------- Export ---------------- #
+EXPORT_NAME = "Exported_Thesis_PDFs"
+
+
+def open_in_file_manager(path):
+    """Shows a folder in Explorer / Finder / the desktop's file manager."""
+    if os.name == 'nt':  # Windows
+        os.startfile(path)
+    elif os.name == 'posix':  # macOS and Linux
+        os.system(f'open "{path}"' if os.uname().sysname == 'Darwin' else f'xdg-open "{path}"')
 
 
-def export_all_pdfs():
-    """Exports all thesis PDFs to a user-selected folder."""
+def unused_folder(path):
+    """path, or "path (2)", "path (3)", ... if a folder of that name exists already."""
+    candidate = path
+    counter = 2
+    while os.path.exists(candidate):
+        candidate = f"{path} ({counter})"
+        counter += 1
+    return candidate
+
+
+def export_all_pdfs(parent=None):
+    """
+    Opens the export dialog: all thesis PDFs go to a folder, ZIP or TAR file,
+    with a manifest of checksums. The export runs in the background (see
+    export_engine.py) with a progress bar and can be cancelled.
+    """
     records = get_all_theses()
     
     if not records:
         messagebox.showinfo("No Data", "There are no thesis PDFs to export.")
         return
-    
-    # Ask user to select destination folder
-    dest_folder = filedialog.askdirectory(title="Select Destination Folder for PDF Export")
-    
-    if not dest_folder:
-        return
-    
-    try:
-        project_dir = os.path.dirname(os.path.abspath(__file__))
-        export_folder = os.path.join(dest_folder, "Exported_Thesis_PDFs")
-        os.makedirs(export_folder, exist_ok=True)
-        
-        exported_count = 0
-        failed_files = []
-        
-        for record in records:
-            thesis_id, title, authors, course, year, file_path = record
-            source_path = os.path.join(project_dir, file_path)
-            
-            if os.path.exists(source_path):
-                # Create subfolder by course
-                course_folder = os.path.join(export_folder, course)
-                os.makedirs(course_folder, exist_ok=True)
-                
-                # Copy file
-                filename = os.path.basename(file_path)
-                dest_path = os.path.join(course_folder, filename)
-                
-                # Handle duplicate filenames
-                if os.path.exists(dest_path):
-                    base, ext = os.path.splitext(filename)
-                    counter = 1
-                    while os.path.exists(dest_path):
-                        dest_path = os.path.join(course_folder, f"{base}_{counter}{ext}")
-                        counter += 1
-                
-                shutil.copy2(source_path, dest_path)
-                exported_count += 1
-            else:
-                failed_files.append(title)
-        
-        # Show results
-        result_msg = f"Successfully exported {exported_count} PDF files to:\n{export_folder}"
-        if failed_files:
-            result_msg += f"\n\nFailed to export {len(failed_files)} files (not found):\n" + "\n".join(failed_files[:5])
-            if len(failed_files) > 5:
-                result_msg += f"\n... and {len(failed_files) - 5} more"
-        
+
+    dialog = tk.Toplevel(parent)
+    dialog.title("📦 Export All PDFs")
+    dialog.configure(bg="#f8f9fa", padx=20, pady=15)
+    dialog.resizable(False, False)
+
+    tk.Label(dialog, text=f"Export {len(records)} thesis PDFs", font=("Arial", 14, "bold"),
+             bg="#f8f9fa", fg="#2c3e50").grid(row=0, column=0, columnspan=3, pady=(0, 10), sticky='w')
+
+    format_var = tk.StringVar(value="folder")
+    tk.Label(dialog, text="Export as:", font=("Arial", 11), bg="#f8f9fa").grid(row=1, column=0, sticky='w')
+    for column, (value, text) in enumerate([("folder", "Folder"), ("zip", "ZIP file"), ("tar", "TAR file")], start=1):
+        tk.Radiobutton(dialog, text=text, variable=format_var, value=value, bg="#f8f9fa").grid(row=1, column=column, sticky='w')
+
+    manifest_var = tk.StringVar(value="csv")
+    tk.Label(dialog, text="Manifest:", font=("Arial", 11), bg="#f8f9fa").grid(row=2, column=0, sticky='w')
+    for column, (value, text) in enumerate([("csv", "CSV"), ("json", "JSON")], start=1):
+        tk.Radiobutton(dialog, text=text, variable=manifest_var, value=value, bg="#f8f9fa").grid(row=2, column=column, sticky='w')
+
+    # PDFs are compressed already, so archives store them as they are unless asked
+    compress_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(dialog, text="Compress the archive (slower, rarely much smaller)", variable=compress_var,
+                   bg="#f8f9fa").grid(row=3, column=0, columnspan=3, sticky='w', pady=(5, 0))
+
+    progress_bar = ttk.Progressbar(dialog, length=360, maximum=1.0)
+    progress_bar.grid(row=4, column=0, columnspan=3, pady=(15, 5))
+    status_label = tk.Label(dialog, text="", font=("Arial", 10, "italic"), fg="#7f8c8d", bg="#f8f9fa")
+    status_label.grid(row=5, column=0, columnspan=3, sticky='w')
+
+    btn_frame = tk.Frame(dialog, bg="#f8f9fa")
+    btn_frame.grid(row=6, column=0, columnspan=3, pady=(10, 0))
+    ingest_queue = get_ingest_queue(dialog)
+    running = {}
+
+    def choose_destination(export_format, compress):
+        if export_format == "folder":
+            dest_folder = filedialog.askdirectory(parent=dialog, title="Select Destination Folder for PDF Export")
+            return unused_folder(os.path.join(dest_folder, EXPORT_NAME)) if dest_folder else ""
+        ext = ".zip" if export_format == "zip" else (".tar.gz" if compress else ".tar")
+        return filedialog.asksaveasfilename(parent=dialog, title="Save PDF Export As", initialfile=EXPORT_NAME + ext,
+                                            defaultextension=ext, filetypes=[("Archive", f"*{ext}")])
+
+    def set_running(is_running):
+        if not dialog.winfo_exists():
+            return  # closed while the export ran on
+        start_btn.config(state=tk.DISABLED if is_running else tk.NORMAL)
+        cancel_btn.config(state=tk.NORMAL if is_running else tk.DISABLED)
+
+    def on_progress(progress, message):
+        if not dialog.winfo_exists():
+            return
+        progress_bar["value"] = progress
+        status_label.config(text=message)
+
+    def on_done(result):
+        exported_count, missing = result
+        set_running(False)
+        destination = running["destination"]
+        result_msg = f"Successfully exported {exported_count} PDF files to:\n{destination}"
+        if missing:
+            titles = [record[1] for record in missing]
+            result_msg += f"\n\nFailed to export {len(titles)} files (not found):\n" + "\n".join(titles[:5])
+            if len(titles) > 5:
+                result_msg += f"\n... and {len(titles) - 5} more"
         messagebox.showinfo("Export Complete", result_msg)
-        
-        # Open the folder
-        if os.name == 'nt':  # Windows
-            os.startfile(export_folder)
-        elif os.name == 'posix':  # macOS and Linux
-            os.system(f'open "{export_folder}"' if os.uname().sysname == 'Darwin' else f'xdg-open "{export_folder}"')
-            
-    except Exception as e:
+        open_in_file_manager(destination if os.path.isdir(destination) else os.path.dirname(destination))
+
+    def on_error(e):
+        set_running(False)
         messagebox.showerror("Export Error", f"Failed to export PDFs:\n{e}")
 
+    def on_job_change(job):
+        if job is running.get("job") and job.state == "cancelled" and dialog.winfo_exists():
+            set_running(False)
+            progress_bar["value"] = 0
+            status_label.config(text="Export cancelled.")
+
+    def start_export():
+        export_format, compress, manifest_format = format_var.get(), compress_var.get(), manifest_var.get()
+        destination = choose_destination(export_format, compress)
+        if not destination:
+            return
+
+        def work(job):
+            def report(done, total):
+                job.report(done / max(total, 1), f"Exported {done}/{total} PDFs")
+            return export_engine.export_pdfs(records, destination, export_format, compress, manifest_format,
+                                             on_progress=report)
+
+        running["destination"] = destination
+        running["job"] = ingest_queue.submit("Export PDFs", work, on_progress=on_progress, on_done=on_done,
+                                             on_error=on_error, kind="export")
+        set_running(True)
+        status_label.config(text="Starting export...")
+
+    start_btn = tk.Button(btn_frame, text="📦 Export", font=("Arial", 11, "bold"), bg="#3498db", fg="white",
+                          width=12, command=start_export)
+    start_btn.pack(side=tk.LEFT, padx=5)
+    cancel_btn = tk.Button(btn_frame, text="✖ Cancel", font=("Arial", 11), bg="#e74c3c", fg="white",
+                           width=12, state=tk.DISABLED, command=lambda: running["job"].cancel())
+    cancel_btn.pack(side=tk.LEFT, padx=5)
+
+    ingest_queue.add_listener(on_job_change)
+    dialog.bind("<Destroy>", lambda e: ingest_queue.remove_listener(on_job_change) if e.widget is dialog else None)
+
 
 def preview_pdf_thumbnail(pdf_path, preview_label):
     """Displays a thumbnail preview of the PDF's first page."""
@@ -214,48 +262,37 @@ def preview_pdf_thumbnail(pdf_path, preview_label):
             preview_label.config(image='', text="PDF file not found")
             return
         
-        doc = fitz.open(full_path)
-        page = doc.load_page(0)
-        zoom = 1.5
-        matrix = fitz.Matrix(zoom, zoom)
-        pix = page.get_pixmap(matrix=matrix, alpha=False)
-        
-        # Save temp image
-        temp_path = "delete_preview_temp.png"
-        pix.save(temp_path)
-        
-        # Display in label
-        image = Image.open(temp_path)
-        image = image.resize((400, 500), Image.LANCZOS)
+        # Cached by path and modification time, so re-selecting a row is instant
+        image = get_thumbnail(full_path, 400, 500)
         photo = ImageTk.PhotoImage(image, master=preview_label)
         preview_label.config(image=photo, text="")
         preview_label.image = photo
         
-        doc.close()
-        
     except Exception as e:
         preview_label.config(image='', text=f"Preview error:\n{str(e)}")
 
 
-def on_tree_select(event, tree, preview_label):
+def on_tree_select(event, results, preview_label):
     """Handles selection in the treeview to show PDF preview."""
-    selected = tree.selection()
+    selected = results.selected_values()
     if selected:
-        item = tree.item(selected[0])
-        file_path = item['values'][5]
+        file_path = selected[0][1][5]
         preview_pdf_thumbnail(file_path, preview_label)
 
 
-def refresh_tree(tree):
-    """Refreshes the treeview with current database records."""
-    # Clear existing items
-    for item in tree.get_children():
-        tree.delete(item)
-    
-    # Load fresh data
-    records = get_all_theses()
-    for record in records:
-        tree.insert('', 'end', values=record)
+def refresh_tree(results):
+    """Refreshes the treeview with current database records (read page by page as they scroll into view)."""
+    try:
+        keys, fetch_rows = sqlite_row_source(
+            db_path,
+            'SELECT thesis_id FROM theses ORDER BY date_uploaded DESC, thesis_id DESC',
+            'SELECT thesis_id, title, authors, course, year, file_path FROM theses WHERE thesis_id IN ({keys})'
+        )
+    except Exception as e:
+        messagebox.showerror("Database Error", f"Failed to load thesis records:\n{e}")
+        results.set_source([], lambda page_keys: {})
+        return
+    results.set_source(keys, fetch_rows)
 
 
 def open_delete_management_ui(on_refresh=None):
@@ -264,6 +301,7 @@ def open_delete_management_ui(on_refresh=None):
     Args:
         on_refresh: Optional callback function to refresh the main UI after deletions
     """
+    migrate(db_path)
     root = tk.Toplevel()
     root.title("🗑️ Thesis Delete & Export Manager")
     root.geometry("1400x800")
@@ -304,8 +342,7 @@ def open_delete_management_ui(on_refresh=None):
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
     
     columns = ('ID', 'Title', 'Authors', 'Course', 'Year', 'File Path')
-    tree = ttk.Treeview(tree_frame, columns=columns, show='headings',
-                        yscrollcommand=scrollbar.set, height=20)
+    tree = ttk.Treeview(tree_frame, columns=columns, show='headings', height=20)
     
     # Configure columns
     tree.column('ID', width=50, anchor='center')
@@ -319,7 +356,7 @@ def open_delete_management_ui(on_refresh=None):
         tree.heading(col, text=col, anchor='center')
     
     tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-    scrollbar.config(command=tree.yview)
+    results = VirtualTreeview(tree, scrollbar)
     
     # Right side - Preview
     right_frame = tk.Frame(content_frame, bg="#f0f3f4", relief="groove", bd=2, width=450)
@@ -334,14 +371,14 @@ def open_delete_management_ui(on_refresh=None):
     preview_label.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
     
     # Bind selection event
-    tree.bind('<<TreeviewSelect>>', lambda e: on_tree_select(e, tree, preview_label))
+    tree.bind(SELECT_EVENT, lambda e: on_tree_select(e, results, preview_label))
     
     # Load initial data
-    refresh_tree(tree)
+    refresh_tree(results)
     
     # Create buttons with refresh callback
     def refresh_callback():
-        refresh_tree(tree)
+        refresh_tree(results)
         preview_label.config(image='', text="Select a thesis to preview")
         preview_label.image = None
         
@@ -352,22 +389,62 @@ def open_delete_management_ui(on_refresh=None):
             except Exception as e:
                 print(f"Main UI refresh error: {e}")
     
+    # Undo bar, shown after a delete until the next one
+    undo_bar = tk.Frame(main_frame, bg="#fff3cd", relief="groove", bd=1)
+    undo_label = tk.Label(undo_bar, text="", font=("Arial", 11), bg="#fff3cd", fg="#856404")
+    undo_label.pack(side=tk.LEFT, padx=10, pady=5)
+    last_delete = {}
+
+    def show_undo(batch_id, count):
+        last_delete["batch_id"] = batch_id
+        undo_label.config(text=f"🗑️ {count} thesis entries moved to the trash.")
+        undo_bar.pack(fill=tk.X, pady=(0, 10), before=content_frame)
+
+    def undo_last_delete():
+        batch_id = last_delete.pop("batch_id", None)
+        if batch_id is None:
+            return
+        try:
+            conn = sqlite3.connect(db_path, timeout=10.0)
+            try:
+                trash.undo_delete(conn, batch_id)
+            finally:
+                conn.close()
+        except Exception as e:
+            messagebox.showerror("Undo Error", f"Failed to restore the deleted theses:\n{e}")
+            return
+        undo_bar.pack_forget()
+        refresh_callback()
+
+    tk.Button(undo_bar, text="↩ Undo", font=("Arial", 11, "bold"), bg="#f39c12", fg="white",
+              relief="raised", bd=1, command=undo_last_delete).pack(side=tk.RIGHT, padx=10, pady=5)
+
+    # Theses deleted long enough ago are removed for good, off the Tk thread
+    def sweep(job):
+        conn = sqlite3.connect(db_path, timeout=10.0)
+        try:
+            return trash.sweep_trash(conn)
+        finally:
+            conn.close()
+
+    get_ingest_queue(root).submit("Empty trash", sweep, kind="sweep")
+
     delete_selected_btn = tk.Button(btn_container, text="🗑️ Delete Selected",
                                     font=("Arial", 12, "bold"), bg="#e74c3c", fg="white",
                                     width=18, height=2, relief="raised", bd=2,
-                                    command=lambda: delete_selected_thesis(tree, preview_label, refresh_callback, on_refresh))
+                                    command=lambda: delete_selected_thesis(results, preview_label, refresh_callback, on_refresh, show_undo))
     delete_selected_btn.pack(side=tk.LEFT, padx=5)
     
     delete_all_btn = tk.Button(btn_container, text="⚠️ Delete All",
                                font=("Arial", 12, "bold"), bg="#c0392b", fg="white",
                                width=18, height=2, relief="raised", bd=2,
-                               command=lambda: delete_all_theses(tree, preview_label, refresh_callback, on_refresh))
+                               command=lambda: delete_all_theses(results, preview_label, refresh_callback, on_refresh, show_undo))
     delete_all_btn.pack(side=tk.LEFT, padx=5)
     
     export_btn = tk.Button(btn_container, text="📦 Export All PDFs",
                           font=("Arial", 12, "bold"), bg="#3498db", fg="white",
                           width=18, height=2, relief="raised", bd=2,
-                          command=export_all_pdfs)
+                          command=lambda: export_all_pdfs(root))
     export_btn.pack(side=tk.LEFT, padx=5)
     
     refresh_btn = tk.Button(btn_container, text="🔄 Refresh",
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import threading
+
+
+class DiskCache:
+    """
+    A size-bounded cache of files in a single directory.
+    Entries are evicted least-recently-used first (by file modification time)
+    once the total size goes over max_bytes.
+    """
+    def __init__(self, directory, max_bytes=500 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # computed lazily on first write
+
+    def path_for(self, name):
+        return os.path.join(self.directory, name)
+
+    def get(self, name):
+        """Returns the path of a cached entry, or None if it is missing."""
+        path = self.path_for(name)
+        try:
+            # Touch the entry so it counts as recently used
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def read(self, name):
+        """Returns the bytes of a cached entry, or None if it is missing."""
+        path = self.get(name)
+        if not path:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, name, data):
+        """Stores data under name and returns the path of the cached file."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(name)
+
+        # Write to a temporary file first so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return path
+
+    def _scan_size(self):
+        total = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    total += entry.stat().st_size
+        return total
+
+    def _evict(self):
+        """Removes the least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        # Leave some headroom so we don't evict on every single write
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
@@ -0,0 +1,231 @@
+import os
+import io
+import csv
+import json
+import hashlib
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pdf_store
+
+FORMATS = ("folder", "zip", "tar")
+MANIFEST_FORMATS = ("csv", "json")
+MANIFEST_FIELDS = ["thesis_id", "title", "authors", "course", "year", "path", "size", "sha256"]
+
+# Folder exports copy this many files at once; the disk, not Python, is the limit
+DEFAULT_WORKERS = 4
+
+
+# ---------------- Planning ---------------- #
+def plan_export(records):
+    """
+    Gives every (thesis_id, title, authors, course, year, file_path) record a
+    unique "<course>/<file name>" inside the export. Names are made unique in
+    memory ("name_1.pdf", ...) instead of probing the disk for each file.
+    Returns (planned, missing): a list of (record, source path, export path)
+    and the records whose PDF isn't on disk.
+    """
+    planned = []
+    missing = []
+    taken = set()
+    for record in records:
+        thesis_id, title, authors, course, year, file_path = record
+        source_path = pdf_store.absolute_path(file_path)
+        if not os.path.isfile(source_path):
+            missing.append(record)
+            continue
+        base, ext = os.path.splitext(pdf_store.export_filename(title, file_path))
+        folder = pdf_store.safe_name(course, "Uncategorized")
+        export_path = f"{folder}/{base}{ext}"
+        counter = 1
+        while export_path.lower() in taken:  # Windows and macOS folders ignore case
+            export_path = f"{folder}/{base}_{counter}{ext}"
+            counter += 1
+        taken.add(export_path.lower())
+        planned.append((record, source_path, export_path))
+    return planned, missing
+
+
+def manifest_entries(planned, results):
+    """One manifest entry per exported PDF; results are the (size, sha256) of each planned file."""
+    entries = []
+    for (record, _, export_path), (size, sha256) in zip(planned, results):
+        thesis_id, title, authors, course, year, _ = record
+        entries.append({"thesis_id": thesis_id, "title": title, "authors": authors, "course": course,
+                        "year": year, "path": export_path, "size": size, "sha256": sha256})
+    return entries
+
+
+def render_manifest(entries, manifest_format):
+    """The manifest as bytes: one CSV row or JSON object per exported PDF."""
+    if manifest_format == "json":
+        return json.dumps(entries, indent=2, ensure_ascii=False).encode("utf-8")
+    text = io.StringIO()
+    writer = csv.DictWriter(text, fieldnames=MANIFEST_FIELDS)
+    writer.writeheader()
+    writer.writerows(entries)
+    return text.getvalue().encode("utf-8-sig")  # so Excel reads the titles as UTF-8
+
+
+class _ChunkSink(io.RawIOBase):
+    """A write-only, unseekable file that keeps what is written until drain() takes it."""
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class HashingReader:
+    """Wraps a binary file; hashes everything read through it (for tarfile.addfile)."""
+    def __init__(self, file):
+        self.file = file
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.digest.update(data)
+        return data
+
+
+# ---------------- Writers ---------------- #
+def iter_zip(planned, manifest_format="csv", compress=False, on_file=None):
+    """
+    Yields a ZIP of the planned files (see plan_export) and their manifest,
+    one piece at a time: each chunk read from a PDF is hashed, compressed
+    (if asked) and handed out straight away. Only the central directory
+    waits for the end, so neither memory nor disk ever holds the archive.
+    """
+    sink = _ChunkSink()
+    results = []
+    # An unseekable output makes zipfile write each entry's sizes after its data
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for _, source_path, export_path in planned:
+            info = zipfile.ZipInfo.from_file(source_path, export_path)
+            # PDFs are compressed already; storing them is much faster and barely larger
+            info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            digest = hashlib.sha256()
+            with open(source_path, "rb") as source:
+                with archive.open(info, "w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as dest_file:
+                    for chunk in iter(lambda: source.read(pdf_store.COPY_CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        dest_file.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            results.append((info.file_size, digest.hexdigest()))
+            if on_file:
+                on_file()
+        manifest = render_manifest(manifest_entries(planned, results), manifest_format)
+        archive.writestr(f"manifest.{manifest_format}", manifest, compress_type=zipfile.ZIP_DEFLATED)
+    yield sink.drain()
+
+
+def _copy_one(source_path, dest_path):
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with open(dest_path, "wb") as dest_file:
+        sha256 = pdf_store.copy_and_hash(source_path, dest_file)
+    return os.path.getsize(dest_path), sha256
+
+
+def _export_folder(planned, destination, on_file, workers):
+    results = [None] * len(planned)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export") as pool:
+        futures = {
+            pool.submit(_copy_one, source_path, os.path.join(destination, *export_path.split("/"))): index
+            for index, (_, source_path, export_path) in enumerate(planned)
+        }
+        try:
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                on_file()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return results
+
+
+def _export_zip(planned, destination, manifest_format, compress, on_file):
+    with open(destination, "wb") as f:
+        for chunk in iter_zip(planned, manifest_format, compress, on_file):
+            f.write(chunk)
+
+
+def _export_tar(planned, archive, on_file):
+    results = []
+    for _, source_path, export_path in planned:
+        info = archive.gettarinfo(source_path, export_path)
+        with open(source_path, "rb") as source:
+            reader = HashingReader(source)
+            archive.addfile(info, reader)
+        results.append((info.size, reader.digest.hexdigest()))
+        on_file()
+    return results
+
+
+def export_pdfs(records, destination, export_format="folder", compress=False, manifest_format="csv",
+                workers=DEFAULT_WORKERS, on_progress=None):
+    """
+    Exports the PDFs of records (rows of thesis_id, title, authors, course,
+    year, file_path) into destination, sorted into one folder per course,
+    with a manifest listing every file and its SHA-256:
+
+    - "folder": destination is a folder; files are copied on a thread pool.
+      A cancelled export keeps the files copied so far.
+    - "zip" / "tar": destination is the archive file, written as one stream
+      (compress=True deflates / gzips it). A failed or cancelled export
+      removes the partial archive.
+
+    Each file is hashed while it is copied, so it is read only once.
+    on_progress(done, total) is called after every file and may raise (e.g.
+    JobCancelled) to stop the export. Returns (exported count, missing
+    records).
+    """
+    if export_format not in FORMATS:
+        raise ValueError(f"Unknown export format: {export_format} (expected one of {FORMATS})")
+    if manifest_format not in MANIFEST_FORMATS:
+        raise ValueError(f"Unknown manifest format: {manifest_format} (expected one of {MANIFEST_FORMATS})")
+
+    planned, missing = plan_export(records)
+    done = [0]
+
+    def on_file():
+        done[0] += 1
+        if on_progress:
+            on_progress(done[0], len(planned))
+
+    manifest_name = f"manifest.{manifest_format}"
+    if export_format == "folder":
+        os.makedirs(destination, exist_ok=True)
+        results = _export_folder(planned, destination, on_file, workers)
+        with open(os.path.join(destination, manifest_name), "wb") as f:
+            f.write(render_manifest(manifest_entries(planned, results), manifest_format))
+        return len(planned), missing
+
+    try:
+        if export_format == "zip":
+            _export_zip(planned, destination, manifest_format, compress, on_file)
+        else:
+            with tarfile.open(destination, "w:gz" if compress else "w") as archive:
+                results = _export_tar(planned, archive, on_file)
+                data = render_manifest(manifest_entries(planned, results), manifest_format)
+                info = tarfile.TarInfo(manifest_name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+    except BaseException:
+        if os.path.exists(destination):
+            os.remove(destination)
+        raise
+    return len(planned), missing
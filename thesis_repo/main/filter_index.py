@@ -0,0 +1,140 @@
+import re
+from operator import contains
+from itertools import compress, repeat
+from collections import OrderedDict
+
+TOKEN_PATTERN = re.compile(r"\w+")
+SEPARATOR_PATTERN = re.compile(r"\W")  # everything between tokens: spaces, "-", ...
+
+# bin() digits -> one byte per row (0 or 1), which itertools.compress accepts
+_DIGITS_TO_FLAGS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def bitmap_flags(bitmap):
+    """
+    The bits of an int as bytes, one per position (0 or 1), lowest first.
+    Stops at the highest set bit; compress() treats the rest as unset.
+    """
+    return bin(bitmap)[:1:-1].encode("ascii").translate(_DIGITS_TO_FLAGS)
+
+
+def bitmap_from_positions(positions, size):
+    """Builds an int with the given bits set, in one pass (OR-ing bit by bit is quadratic)."""
+    bits = bytearray(b"0" * size)
+    for position in positions:
+        bits[size - 1 - position] = 49  # ord("1")
+    return int(bits, 2) if size else 0
+
+
+class FilterIndex:
+    """
+    Answers "which rows match this search text, course and year" without
+    touching every row on every keystroke.
+
+    Built once when the rows are loaded. Every row gets a bit position (its
+    place in the list), and each title token, course and year gets a bitmap
+    (a Python int) of the rows it occurs in, as does each separator character
+    (space, "-", ...) of the titles. A filter then only scans the vocabulary
+    of distinct tokens and combines bitmaps; titles are lowered once here
+    instead of once per keystroke.
+
+    Matching is the same as the plain loop it replaces: the search text must
+    occur (case-insensitively) somewhere in the title, the course or the year.
+    """
+    def __init__(self, rows, key=lambda row: row[0], title=lambda row: row[1],
+                 course=lambda row: row[2], year=lambda row: row[3]):
+        self.keys = []
+        self.titles = []  # lowered, for checking searches that span several tokens
+        token_positions = {}
+        separator_positions = {}
+        course_positions = {}
+        year_positions = {}
+
+        for position, row in enumerate(rows):
+            self.keys.append(key(row))
+            lowered = title(row).lower()
+            self.titles.append(lowered)
+            for token in set(TOKEN_PATTERN.findall(lowered)):
+                token_positions.setdefault(token, []).append(position)
+            for separator in set(SEPARATOR_PATTERN.findall(lowered)):
+                separator_positions.setdefault(separator, []).append(position)
+            course_positions.setdefault(course(row), []).append(position)
+            year_positions.setdefault(str(year(row)), []).append(position)
+
+        size = len(self.keys)
+        self.token_bitmaps = {t: bitmap_from_positions(p, size) for t, p in token_positions.items()}
+        self.separator_bitmaps = {c: bitmap_from_positions(p, size) for c, p in separator_positions.items()}
+        self.course_bitmaps = {c: bitmap_from_positions(p, size) for c, p in course_positions.items()}
+        self.year_bitmaps = {y: bitmap_from_positions(p, size) for y, p in year_positions.items()}
+        self.all_rows = (1 << len(self.keys)) - 1
+        self._fragment_cache = OrderedDict()  # fragment -> (matching tokens, bitmap)
+
+    def filter(self, text="", course=None, year=None):
+        """Returns the keys of the matching rows, in their original order."""
+        bitmap = self.all_rows
+        if course is not None:
+            bitmap &= self.course_bitmaps.get(course, 0)
+        if year is not None:
+            bitmap &= self.year_bitmaps.get(str(year), 0)
+        text = text.lower()
+        if text and bitmap:
+            bitmap &= self._text_bitmap(text, bitmap)
+        if bitmap == self.all_rows:
+            return list(self.keys)
+        # compress() picks the keys in C, so a broad match costs no Python work per row
+        return list(compress(self.keys, bitmap_flags(bitmap)))
+
+    def _text_bitmap(self, text, candidates):
+        matches = 0
+        for row_course, course_bitmap in self.course_bitmaps.items():
+            if text in row_course.lower():
+                matches |= course_bitmap
+        for row_year, year_bitmap in self.year_bitmaps.items():
+            if text in row_year:
+                matches |= year_bitmap
+
+        # Every word fragment of the text must be inside some token of the
+        # title, and every separator in it must occur in the title too
+        fragments = TOKEN_PATTERN.findall(text)
+        title_matches = candidates
+        for separator in set(SEPARATOR_PATTERN.findall(text)):
+            title_matches &= self.separator_bitmaps.get(separator, 0)
+        for fragment in fragments:
+            if not title_matches:
+                break
+            title_matches &= self._fragment_bitmap(fragment)
+
+        if title_matches and fragments != [text]:
+            # Several fragments (or punctuation): check they are adjacent as typed
+            title_matches = self._scan_titles(text, title_matches)
+        return matches | title_matches
+
+    def _fragment_bitmap(self, fragment):
+        """Bitmap of rows with a title token containing fragment."""
+        cached = self._fragment_cache.get(fragment)
+        if cached is not None:
+            self._fragment_cache.move_to_end(fragment)
+            return cached[1]
+
+        # While typing, each fragment extends the previous one, so only the
+        # tokens that matched a shorter cached fragment need to be checked
+        vocabulary = self.token_bitmaps.keys()
+        for shorter, (tokens, _) in self._fragment_cache.items():
+            if shorter in fragment and len(tokens) < len(vocabulary):
+                vocabulary = tokens
+
+        tokens = [token for token in vocabulary if fragment in token]
+        bitmap = 0
+        for token in tokens:
+            bitmap |= self.token_bitmaps[token]
+
+        self._fragment_cache[fragment] = (tokens, bitmap)
+        while len(self._fragment_cache) > 64:
+            self._fragment_cache.popitem(last=False)
+        return bitmap
+
+    def _scan_titles(self, text, candidates):
+        # The candidates' titles are picked and checked in C; only the matches are visited in Python
+        flags = bitmap_flags(candidates)
+        hits = map(contains, compress(self.titles, flags), repeat(text))
+        return bitmap_from_positions(compress(compress(range(len(self.titles)), flags), hits), len(self.keys))
@@ -0,0 +1,178 @@
+import queue
+import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been cancelled."""
+
+
+class IngestJob:
+    """A unit of background work (metadata extraction, watermarking, ...)."""
+    _ids = itertools.count(1)
+
+    def __init__(self, label, owner, kind="ingest"):
+        self.id = next(self._ids)
+        self.label = label
+        self.kind = kind
+        self.progress = 0.0
+        self.message = "Queued"
+        self.state = "queued"  # queued, running, done, failed, cancelled
+        self.future = None
+        self._owner = owner
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """Asks the job to stop. Jobs that haven't started yet never run."""
+        self._cancel_event.set()
+        if self.future is not None and self.future.cancel():
+            self._owner._post(self, "cancelled", None)
+
+    def check_cancelled(self):
+        """Called by the worker between steps; raises JobCancelled if cancel() was called."""
+        if self._cancel_event.is_set():
+            raise JobCancelled(self.label)
+
+    def report(self, progress, message):
+        """Called by the worker to publish progress (0.0 - 1.0). Also checks for cancellation."""
+        self.check_cancelled()
+        self._owner._post(self, "progress", (progress, message))
+
+
+class IngestQueue:
+    """
+    Runs slow ingestion work on a thread pool so the Tk window stays responsive.
+
+    Tkinter widgets may only be touched from the main thread, so workers never
+    call back into Tk directly: they post events to a queue which is drained on
+    the Tk thread with widget.after(), and only then are the callbacks called.
+    """
+    def __init__(self, widget, max_workers=2, poll_ms=50):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.jobs = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._events = queue.Queue()
+        self._callbacks = {}
+        self._listeners = []
+        self._polling = False
+
+    def add_listener(self, listener):
+        """Registers listener(job), called on the Tk thread whenever any job changes state."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def submit(self, label, work, on_progress=None, on_done=None, on_error=None, kind="ingest"):
+        """
+        Schedules work(job) on the pool. Callbacks run on the Tk thread:
+        on_progress(progress, message), on_done(result) and on_error(exception).
+        kind is a free-form tag that lets screens pick out the jobs they care about.
+        """
+        job = IngestJob(label, self, kind)
+        self.jobs.append(job)
+        self._callbacks[job.id] = (on_progress, on_done, on_error)
+        job.future = self._executor.submit(self._run, job, work)
+        self._notify(job)
+        self._schedule_poll()
+        return job
+
+    def clear_finished(self):
+        """Forgets jobs that are done, failed or cancelled."""
+        self.jobs = [job for job in self.jobs if job.state in ("queued", "running")]
+
+    def cancel_all(self):
+        for job in self.jobs:
+            if job.state in ("queued", "running"):
+                job.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=False)
+
+    # ---------------- Worker side ---------------- #
+    def _run(self, job, work):
+        try:
+            job.check_cancelled()
+            self._post(job, "progress", (0.0, "Started"))
+            result = work(job)
+            self._post(job, "done", result)
+        except JobCancelled:
+            self._post(job, "cancelled", None)
+        except Exception as e:
+            self._post(job, "failed", e)
+
+    def _post(self, job, kind, payload):
+        self._events.put((job, kind, payload))
+
+    # ---------------- Tk side ---------------- #
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        while True:
+            try:
+                job, kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            self._dispatch(job, kind, payload)
+
+        # Keep polling while anything is still pending
+        if any(job.state in ("queued", "running") for job in self.jobs):
+            self._schedule_poll()
+
+    def _dispatch(self, job, kind, payload):
+        if job.state in ("done", "failed", "cancelled"):
+            return  # already finished, e.g. cancelled before it started
+        on_progress, on_done, on_error = self._callbacks.get(job.id, (None, None, None))
+        try:
+            if kind == "progress":
+                job.state = "running"
+                job.progress, job.message = payload
+                if on_progress:
+                    on_progress(job.progress, job.message)
+            elif kind == "done":
+                job.state, job.progress, job.message = "done", 1.0, "Done"
+                if on_done:
+                    on_done(payload)
+            elif kind == "failed":
+                job.state, job.message = "failed", f"Failed: {payload}"
+                if on_error:
+                    on_error(payload)
+            elif kind == "cancelled":
+                job.state, job.message = "cancelled", "Cancelled"
+        except Exception as e:
+            print(f"Ingest callback error: {e}")
+        finally:
+            if job.state in ("done", "failed", "cancelled"):
+                self._callbacks.pop(job.id, None)
+        self._notify(job)
+
+    def _notify(self, job):
+        for listener in list(self._listeners):
+            try:
+                listener(job)
+            except Exception as e:
+                print(f"Ingest listener error: {e}")
+
+
+_shared_queue = None
+
+
+def get_ingest_queue(widget):
+    """Returns the process-wide ingest queue, bound to the Tk root of widget."""
+    global _shared_queue
+    if _shared_queue is None:
+        # Bind to the root window so jobs outlive the form that started them
+        _shared_queue = IngestQueue(widget.nametowidget("."))
+    return _shared_queue
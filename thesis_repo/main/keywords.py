@@ -0,0 +1,145 @@
+import sqlite3
+import hashlib
+import threading
+
+from migrations import DB_PATH, migrate
+
+# Settings passed to KeyBERT; they are part of the cache key
+KEYPHRASE_NGRAM_RANGE = (1, 2)
+STOP_WORDS = 'english'
+
+# The KeyBERT model (a sentence-transformer) takes seconds to load, so it is
+# created on first use and shared by every window in the process.
+_kw_model = None
+_load_error = None
+_lock = threading.Lock()
+_migrated_paths = set()
+
+
+def get_kw_model():
+    """Returns the shared KeyBERT model, loading it on first call. Returns None if it can't be loaded."""
+    global _kw_model, _load_error
+    if _kw_model is not None or _load_error is not None:
+        return _kw_model
+
+    with _lock:
+        # Another thread may have finished loading while we waited
+        if _kw_model is None and _load_error is None:
+            try:
+                from keybert import KeyBERT
+                _kw_model = KeyBERT()
+            except Exception as e:
+                # KeyBERT requires certain NLP models/libraries, this handles failure gracefully
+                print(f"KeyBERT failed to initialize: {e}. Keyword extraction will be disabled.")
+                _load_error = e
+    return _kw_model
+
+
+def is_loaded():
+    """True once the model is ready, so callers can say when a first extraction will be slow."""
+    return _kw_model is not None
+
+
+def warm_up_in_background():
+    """Starts loading the model on a daemon thread so it is ready by the time it's needed."""
+    if _kw_model is not None or _load_error is not None:
+        return
+    threading.Thread(target=get_kw_model, name="keybert-warmup", daemon=True).start()
+
+
+# ---------------- Keyword Cache ---------------- #
+def content_hash(text, num_keywords=5):
+    """Hash of the text plus the extraction settings, used as the cache key."""
+    settings = f"{num_keywords}|{KEYPHRASE_NGRAM_RANGE}|{STOP_WORDS}\n"
+    return hashlib.sha256((settings + text.strip()).encode("utf-8")).hexdigest()
+
+
+def _connect_cache(db_path):
+    if db_path not in _migrated_paths:
+        migrate(db_path)
+        _migrated_paths.add(db_path)
+    return sqlite3.connect(db_path, timeout=10.0)
+
+
+def _read_cache(db_path, hashes):
+    found = {}
+    unique_hashes = list(set(hashes))
+    conn = _connect_cache(db_path)
+    try:
+        # Stay well below SQLite's limit on query parameters
+        for start in range(0, len(unique_hashes), 500):
+            chunk = unique_hashes[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT content_hash, keywords FROM keyword_cache WHERE content_hash IN ({placeholders})", chunk
+            )
+            found.update(rows)
+    finally:
+        conn.close()
+    return found
+
+
+def _write_cache(db_path, entries):
+    conn = _connect_cache(db_path)
+    try:
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO keyword_cache (content_hash, keywords) VALUES (?, ?)", entries)
+    finally:
+        conn.close()
+
+
+# ---------------- Keyword Extraction ---------------- #
+def extract_keywords_batch(texts, num_keywords=5, db_path=DB_PATH):
+    """
+    Extracts keywords for many documents and returns one comma-separated string per text.
+
+    Texts seen before (same content, same settings) are answered from the
+    keyword cache; the rest go to KeyBERT together in a single call. The model
+    is only loaded if something actually needs to be computed.
+    Raises RuntimeError if the model is needed but unavailable.
+    """
+    if not texts:
+        return []
+
+    hashes = [content_hash(text, num_keywords) for text in texts]
+    try:
+        results = _read_cache(db_path, hashes)
+    except sqlite3.Error as e:
+        print(f"Keyword cache unavailable: {e}")
+        results = {}
+
+    # Each distinct uncached text is sent to the model once
+    missing = {}
+    for text, text_hash in zip(texts, hashes):
+        if text_hash not in results:
+            missing.setdefault(text_hash, text)
+
+    if missing:
+        kw_model = get_kw_model()
+        if kw_model is None:
+            raise RuntimeError(f"Keyword model unavailable: {_load_error}")
+
+        missing_texts = list(missing.values())
+        extracted = kw_model.extract_keywords(missing_texts, keyphrase_ngram_range=KEYPHRASE_NGRAM_RANGE,
+                                              stop_words=STOP_WORDS, top_n=num_keywords)
+        if len(missing_texts) == 1:
+            extracted = [extracted]  # KeyBERT unwraps single-document results
+
+        new_entries = []
+        for text_hash, keywords in zip(missing, extracted):
+            results[text_hash] = ", ".join([kw[0] for kw in keywords])
+            new_entries.append((text_hash, results[text_hash]))
+        try:
+            _write_cache(db_path, new_entries)
+        except sqlite3.Error as e:
+            print(f"Could not update keyword cache: {e}")
+
+    return [results[text_hash] for text_hash in hashes]
+
+
+def extract_keywords(text, num_keywords=5, db_path=DB_PATH):
+    """
+    Extracts keywords from text and returns them comma-separated.
+    Raises RuntimeError if the model is needed but unavailable.
+    """
+    return extract_keywords_batch([text], num_keywords, db_path)[0]
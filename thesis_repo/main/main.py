@@ -5,10 +5,16 @@ from search import ThesisSearchApp
 import sqlite3
 from update_thesis import UpdateThesisApp
 from delete import open_delete_management_ui
+from migrations import migrate
+from virtual_tree import VirtualTreeview, sqlite_row_source
+
+DB_FILE = "thesis_repository.db"
 
 
 class Repo:
     def __init__(self):
+        # Create or upgrade the schema before any screen reads from it
+        migrate(DB_FILE)
         self.root = tk.Tk()
         self.root.title("Research Development Office")
         self.root.state("zoomed")
@@ -90,7 +96,6 @@ class Repo:
 
         self.tree = ttk.Treeview(
             tree_container,
-            yscrollcommand=tree_scroll.set,
             columns=("title", "course", "date_uploaded"),
             show="headings",
             height=15
@@ -105,11 +110,13 @@ class Repo:
         self.tree.column("date_uploaded", width=220, anchor="center")
 
         self.tree.pack(fill=tk.BOTH, expand=True)
-        tree_scroll.config(command=self.tree.yview)
 
         self.tree.tag_configure("oddrow", background="#f9f9f9")
         self.tree.tag_configure("evenrow", background="#eef7fb")
 
+        # Only the rows on screen are created; the rest are read as the user scrolls
+        self.results = VirtualTreeview(self.tree, tree_scroll)
+
         # Load DB data
         self.load_data_from_database()
 
@@ -182,7 +189,7 @@ class Repo:
 
     def get_thesis_count(self):
         try:
-            conn = sqlite3.connect("thesis_repository.db")
+            conn = sqlite3.connect(DB_FILE)
             cursor = conn.cursor()
             cursor.execute("SELECT COUNT(*) FROM theses")
             count = cursor.fetchone()[0]
@@ -191,24 +198,27 @@ class Repo:
         except Exception:
             return 0
 
+    @staticmethod
+    def format_recent_row(row):
+        from datetime import datetime
+        thesis_id, title, course, date_uploaded = row
+        title = (title[:40] + "...") if len(title) > 43 else title
+        try:
+            dt_obj = datetime.strptime(date_uploaded, "%Y-%m-%d %H:%M:%S")
+            date_uploaded = dt_obj.strftime("%b %d, %Y - %I:%M %p")
+        except:
+            pass
+        return (title, course, date_uploaded)
+
     def load_data_from_database(self):
         try:
-            from datetime import datetime
-            conn = sqlite3.connect("thesis_repository.db")
-            cursor = conn.cursor()
-            cursor.execute("SELECT title, course, date_uploaded FROM theses ORDER BY date_uploaded DESC")
-            rows = cursor.fetchall()
-            for index, row in enumerate(rows):
-                tag = "evenrow" if index % 2 == 0 else "oddrow"
-                title = (row[0][:40] + "...") if len(row[0]) > 43 else row[0]
-                course = row[1]
-                try:
-                    dt_obj = datetime.strptime(row[2], "%Y-%m-%d %H:%M:%S")
-                    date_uploaded = dt_obj.strftime("%b %d, %Y - %I:%M %p")
-                except:
-                    date_uploaded = row[2]
-                self.tree.insert("", "end", values=(title, course, date_uploaded), tags=(tag,))
-            conn.close()
+            keys, fetch_rows = sqlite_row_source(
+                DB_FILE,
+                "SELECT thesis_id FROM theses ORDER BY date_uploaded DESC, thesis_id DESC",
+                "SELECT thesis_id, title, course, date_uploaded FROM theses WHERE thesis_id IN ({keys})",
+                format_row=self.format_recent_row
+            )
+            self.results.set_source(keys, fetch_rows)
         except Exception as e:
             print("DB Load Error:", e)
 
@@ -225,8 +235,6 @@ class Repo:
         open_delete_management_ui(on_refresh = self.refresh_recent_entries)
 
     def refresh_recent_entries(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
         self.load_data_from_database()
 
         # Update thesis count and label
@@ -0,0 +1,329 @@
+import sqlite3
+import os
+
+# Define DB_PATH relative to the script's directory
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thesis_repository.db")
+
+
+# ---------------- Migrations ---------------- #
+# Each migration runs exactly once, in list order. The number of applied
+# migrations is stored in SQLite's built-in "PRAGMA user_version", so never
+# reorder or remove entries -- only append new ones.
+
+def create_theses_table(conn):
+    """Creates the 'theses' table and adds the 'abstract' column to older databases."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS theses (
+            thesis_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            abstract TEXT,
+            authors TEXT NOT NULL,
+            course TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            keywords TEXT,
+            file_path TEXT NOT NULL,
+            date_uploaded DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(theses)")]
+    if "abstract" not in columns:
+        conn.execute("ALTER TABLE theses ADD COLUMN abstract TEXT")
+
+
+def create_search_index(conn):
+    """
+    Creates the 'theses_fts' full-text index over title, authors, keywords and
+    abstract, keeps it in sync with triggers and backfills it from existing rows.
+    """
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS theses_fts USING fts5(
+            title, authors, keywords, abstract,
+            content='theses', content_rowid='thesis_id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS theses_fts_insert AFTER INSERT ON theses BEGIN
+            INSERT INTO theses_fts (rowid, title, authors, keywords, abstract)
+            VALUES (new.thesis_id, new.title, new.authors, new.keywords, new.abstract);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS theses_fts_delete AFTER DELETE ON theses BEGIN
+            INSERT INTO theses_fts (theses_fts, rowid, title, authors, keywords, abstract)
+            VALUES ('delete', old.thesis_id, old.title, old.authors, old.keywords, old.abstract);
+        END
+    ''')
+    # Only re-index when an indexed column changes
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS theses_fts_update
+        AFTER UPDATE OF title, authors, keywords, abstract ON theses BEGIN
+            INSERT INTO theses_fts (theses_fts, rowid, title, authors, keywords, abstract)
+            VALUES ('delete', old.thesis_id, old.title, old.authors, old.keywords, old.abstract);
+            INSERT INTO theses_fts (rowid, title, authors, keywords, abstract)
+            VALUES (new.thesis_id, new.title, new.authors, new.keywords, new.abstract);
+        END
+    ''')
+    # Backfill the index from rows that already exist
+    conn.execute("INSERT INTO theses_fts (theses_fts) VALUES ('rebuild')")
+
+
+def add_abstract_page_column(conn):
+    """
+    Adds 'abstract_page': the 0-based page index of the abstract, -1 if the PDF
+    has none, or NULL if it hasn't been scanned yet (see backfill_abstract_pages.py).
+    """
+    conn.execute("ALTER TABLE theses ADD COLUMN abstract_page INTEGER")
+
+
+def create_bulk_imports_table(conn):
+    """
+    Creates 'bulk_imports', which remembers every source PDF bulk_import.py has
+    already saved so an interrupted import can pick up where it left off.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bulk_imports (
+            source_path TEXT PRIMARY KEY,
+            source_size INTEGER NOT NULL,
+            source_mtime REAL NOT NULL,
+            thesis_id INTEGER,
+            imported_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def create_keyword_cache_table(conn):
+    """
+    Creates 'keyword_cache', which maps a hash of a document's text (and the
+    extraction settings) to its KeyBERT keywords so unchanged text is never re-processed.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS keyword_cache (
+            content_hash TEXT PRIMARY KEY,
+            keywords TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def create_change_counter(conn):
+    """
+    Creates 'theses_changes', a single-row counter that triggers bump on every
+    insert, update and delete of 'theses'. Readers that cache data derived from
+    the table (e.g. the web landing page) compare it to tell when to reload.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS theses_changes (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO theses_changes (id, version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS theses_changes_{event.lower()} AFTER {event} ON theses BEGIN
+                UPDATE theses_changes SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+
+def add_lookup_indexes(conn):
+    """
+    Adds indexes for the ways every screen reads the table: newest first,
+    filtered by course and/or year, and looked up by file path.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_theses_date_uploaded ON theses (date_uploaded DESC, thesis_id DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_theses_course_year_date ON theses (course, year, date_uploaded DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_theses_year_date ON theses (year, date_uploaded DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_theses_file_path ON theses (file_path)")
+
+
+def normalize_year(conn):
+    """
+    Stores every numeric year as an INTEGER (older rows may hold text such as
+    ' 2021' or reals like 2021.0), so 'year = ?' matches them and can use an index.
+    """
+    conn.execute('''
+        UPDATE theses SET year = CAST(trim(year) AS INTEGER)
+        WHERE typeof(year) != 'integer'
+          AND trim(year) GLOB '[0-9]*' AND trim(year) NOT GLOB '*[^0-9.]*'
+          AND CAST(trim(year) AS INTEGER) = CAST(trim(year) AS REAL)
+    ''')
+
+
+def add_keyset_indexes(conn):
+    """
+    Rebuilds the filter indexes so they end in (date_uploaded DESC, thesis_id DESC),
+    the order /api/search pages through, so no page needs a sort step.
+    """
+    conn.execute("DROP INDEX IF EXISTS idx_theses_course_year_date")
+    conn.execute("DROP INDEX IF EXISTS idx_theses_year_date")
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_theses_course_year_date
+                    ON theses (course, year, date_uploaded DESC, thesis_id DESC)''')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_theses_course_date
+                    ON theses (course, date_uploaded DESC, thesis_id DESC)''')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_theses_year_date
+                    ON theses (year, date_uploaded DESC, thesis_id DESC)''')
+
+
+def create_trigram_index(conn):
+    """
+    Creates 'theses_trigram', an FTS5 index of every 3-character substring of
+    title, authors and keywords for substring search (see trigram_search.py),
+    kept in sync with triggers like 'theses_fts'.
+    SQLite builds older than 3.34 have no trigram tokenizer; the table is
+    then skipped and searches fall back to LIKE.
+    """
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS theses_trigram USING fts5(
+                title, authors, keywords,
+                content='theses', content_rowid='thesis_id',
+                tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        if "tokenizer" not in str(e):
+            raise
+        print(f"Trigram search unavailable in SQLite {sqlite3.sqlite_version}: {e}")
+        return
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS theses_trigram_insert AFTER INSERT ON theses BEGIN
+            INSERT INTO theses_trigram (rowid, title, authors, keywords)
+            VALUES (new.thesis_id, new.title, new.authors, new.keywords);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS theses_trigram_delete AFTER DELETE ON theses BEGIN
+            INSERT INTO theses_trigram (theses_trigram, rowid, title, authors, keywords)
+            VALUES ('delete', old.thesis_id, old.title, old.authors, old.keywords);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS theses_trigram_update
+        AFTER UPDATE OF title, authors, keywords ON theses BEGIN
+            INSERT INTO theses_trigram (theses_trigram, rowid, title, authors, keywords)
+            VALUES ('delete', old.thesis_id, old.title, old.authors, old.keywords);
+            INSERT INTO theses_trigram (rowid, title, authors, keywords)
+            VALUES (new.thesis_id, new.title, new.authors, new.keywords);
+        END
+    ''')
+    conn.execute("INSERT INTO theses_trigram (theses_trigram) VALUES ('rebuild')")
+
+
+def catch_up_trigram_index(conn):
+    """
+    create_trigram_index is counted as applied even when SQLite had no
+    trigram tokenizer, so it never runs again. Once the program runs on a
+    SQLite that has one, this creates the table it skipped.
+    """
+    exists = "SELECT 1 FROM sqlite_master WHERE name = 'theses_trigram'"
+    if sqlite3.sqlite_version_info < (3, 34, 0) or conn.execute(exists).fetchone():
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not conn.execute(exists).fetchone():  # unless another process just created it
+            create_trigram_index(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def add_content_hash_column(conn):
+    """
+    Adds 'content_hash', the SHA-256 of the PDF as it was uploaded (before
+    watermarking), which is also its name in thesis_files/store (see
+    pdf_store.py). Identical uploads share one stored file. Rows saved
+    before this have no hash and keep their old file paths.
+    """
+    conn.execute("ALTER TABLE theses ADD COLUMN content_hash TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_theses_content_hash ON theses (content_hash)")
+
+
+def add_watermark_version_column(conn):
+    """
+    Adds 'watermark_version', the watermark.WATERMARK_VERSION the stored PDF
+    was stamped with, or NULL if it has no watermark. Rows saved before this
+    were stamped when uploaded but have no version recorded. A stored file
+    is never stamped again, so editing only the details of a thesis doesn't
+    rewrite its PDF.
+    """
+    conn.execute("ALTER TABLE theses ADD COLUMN watermark_version INTEGER")
+
+
+def create_trash_table(conn):
+    """
+    Creates 'theses_trash', where trash.delete_theses moves deleted rows
+    (the whole row as JSON, so later columns need no change here) until
+    trash.sweep_trash removes them for good. Rows deleted together share a
+    batch_id, so one delete can be undone as a whole.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS theses_trash (
+            thesis_id INTEGER PRIMARY KEY,
+            batch_id INTEGER NOT NULL,
+            file_path TEXT NOT NULL,
+            row TEXT NOT NULL,
+            deleted_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_theses_trash_batch ON theses_trash (batch_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_theses_trash_file_path ON theses_trash (file_path)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_theses_trash_deleted_at ON theses_trash (deleted_at)")
+
+
+MIGRATIONS = [
+    create_theses_table,
+    create_search_index,
+    add_abstract_page_column,
+    create_bulk_imports_table,
+    create_keyword_cache_table,
+    create_change_counter,
+    add_lookup_indexes,
+    normalize_year,
+    add_keyset_indexes,
+    create_trigram_index,
+    add_content_hash_column,
+    add_watermark_version_column,
+    create_trash_table,
+]
+
+
+def apply_migrations(conn):
+    """
+    Applies every pending migration on an open connection, one transaction each.
+
+    Every program migrates when it starts, so two may do it at once. Each
+    step therefore takes the write lock first (BEGIN IMMEDIATE) and re-reads
+    the version under it, skipping a migration another process just applied.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    while version < len(MIGRATIONS):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < len(MIGRATIONS):
+                MIGRATIONS[version](conn)
+                version += 1
+                conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    catch_up_trigram_index(conn)
+    return len(MIGRATIONS)
+
+
+def migrate(db_path=DB_PATH):
+    """Opens the database at db_path and brings its schema up to date."""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=10.0)
+    try:
+        return apply_migrations(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    print(f"Database schema is at version {migrate()}.")
@@ -0,0 +1,232 @@
+import os
+import re
+import hashlib
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+THESIS_FILES_DIR = os.path.join(PROJECT_DIR, "thesis_files")
+
+# Content-addressed PDFs: thesis_files/store/<first 2 hex digits>/<sha256>.pdf
+STORE_DIR = os.path.join(THESIS_FILES_DIR, "store")
+
+# PDFs of deleted theses wait here, at the same relative path, until the trash is swept (see trash.py)
+TRASH_DIR = os.path.join(THESIS_FILES_DIR, "trash")
+
+# Large enough to keep the disk busy, small enough that a 500 MB scan isn't loaded at once
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def object_path(content_hash):
+    """Absolute path where the PDF whose original contents hash to content_hash is stored."""
+    return os.path.join(STORE_DIR, content_hash[:2], f"{content_hash}.pdf")
+
+
+def relative_path(path):
+    """The form stored in theses.file_path: relative to the project folder."""
+    return os.path.relpath(path, start=PROJECT_DIR)
+
+
+def absolute_path(file_path):
+    """Resolves a theses.file_path (relative or, in older rows, absolute) to an absolute path."""
+    return os.path.join(PROJECT_DIR, file_path)
+
+
+def _is_inside(path, folder):
+    try:
+        return os.path.commonpath([os.path.abspath(path), folder]) == folder
+    except ValueError:
+        return False  # e.g. another drive on Windows
+
+
+def copy_and_hash(source_path, dest_file, on_progress=None):
+    """
+    Copies source_path into the open binary file dest_file, hashing every
+    chunk on the way, so the file is read only once. Returns the SHA-256 as
+    hex. on_progress(copied_bytes, total_bytes) is called after each chunk.
+    """
+    digest = hashlib.sha256()
+    total = os.path.getsize(source_path)
+    copied = 0
+    buffer = bytearray(min(COPY_CHUNK_SIZE, total) or 1)
+    view = memoryview(buffer)
+    with open(source_path, "rb") as source:
+        while True:
+            read = source.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+            dest_file.write(view[:read])
+            copied += read
+            if on_progress:
+                on_progress(copied, total)
+    return digest.hexdigest()
+
+
+def ingest_pdf(source_path, prepare=None, on_progress=None):
+    """
+    Stores source_path under the SHA-256 of its contents and returns
+    (content_hash, absolute path).
+
+    The source is read once: it is hashed while being copied to a temp file
+    inside the store. prepare(path), if given, then runs on that copy (e.g.
+    to watermark it) before it is renamed into place, so a file at a content
+    address is always complete. If the same contents are already stored the
+    copy is dropped and nothing is prepared again. on_progress is passed to
+    copy_and_hash.
+    """
+    os.makedirs(STORE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".ingest-", suffix=".pdf", dir=STORE_DIR)
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            content_hash = copy_and_hash(source_path, temp_file, on_progress)
+        target_path = object_path(content_hash)
+        if not os.path.exists(target_path):
+            if prepare:
+                prepare(temp_path)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            os.replace(temp_path, target_path)
+        return content_hash, target_path
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def known_abstract_page(conn, content_hash):
+    """The abstract_page already found for these contents by another row, or None."""
+    row = conn.execute(
+        "SELECT abstract_page FROM theses WHERE content_hash = ? AND abstract_page IS NOT NULL LIMIT 1",
+        (content_hash,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def known_watermark_version(conn, content_hash):
+    """The watermark_version of the stored file for these contents, or None."""
+    row = conn.execute(
+        "SELECT watermark_version FROM theses WHERE content_hash = ? AND watermark_version IS NOT NULL LIMIT 1",
+        (content_hash,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def stored_copy(conn, path):
+    """
+    (file_path, content_hash, abstract_page, watermark_version) of a thesis
+    whose stored PDF is the file at path, or None. Such a file is stamped
+    already; ingesting it again would copy it and stack a second watermark.
+    """
+    full_path = os.path.abspath(absolute_path(path))
+    return conn.execute(
+        "SELECT file_path, content_hash, abstract_page, watermark_version FROM theses "
+        "WHERE file_path IN (?, ?, ?) LIMIT 1",
+        (path, relative_path(full_path), full_path)
+    ).fetchone()
+
+
+class StoredFileMissing(Exception):
+    """The stored PDF a row was about to refer to was removed meanwhile; store it again."""
+
+
+def release_file(conn, file_path):
+    """
+    Deletes a stored PDF once no row of 'theses' refers to it any more; with
+    deduplication several rows can share one file. Files outside
+    thesis_files are never touched. Returns True if the file was deleted.
+
+    The check and the delete happen under the write lock (BEGIN IMMEDIATE),
+    the same lock claim_file is called under, so a save that is about to
+    use the file either commits its row first (and the file is kept) or
+    notices the file is gone. Call it outside a transaction.
+    """
+    full_path = absolute_path(file_path)
+    if not _is_inside(full_path, THESIS_FILES_DIR):
+        return False
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        used = conn.execute("SELECT 1 FROM theses WHERE file_path = ? LIMIT 1", (file_path,)).fetchone()
+        deleted = not used and os.path.exists(full_path)
+        if deleted:
+            os.remove(full_path)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return deleted
+
+
+def claim_file(file_path):
+    """
+    Call under the write lock (BEGIN IMMEDIATE), right before inserting or
+    updating a row that refers to the stored PDF at file_path. Stored files
+    are shared, and release_file or trash.delete_theses may have removed
+    this one since it was stored (e.g. a cancelled upload of the same PDF).
+    A file moved to the trash is brought back; raises StoredFileMissing if
+    it is gone. Once the row is committed the file stays.
+    """
+    if not os.path.exists(absolute_path(file_path)):
+        restore_from_trash(file_path)
+        if not os.path.exists(absolute_path(file_path)):
+            raise StoredFileMissing(f"{file_path} was removed while it was being saved.")
+
+
+def trash_path(file_path):
+    """Where the PDF at file_path waits in the trash, or None for files outside thesis_files."""
+    full_path = os.path.abspath(absolute_path(file_path))
+    if not _is_inside(full_path, THESIS_FILES_DIR) or _is_inside(full_path, TRASH_DIR):
+        return None
+    return os.path.join(TRASH_DIR, os.path.relpath(full_path, THESIS_FILES_DIR))
+
+
+def move_to_trash(file_path):
+    """Moves a stored PDF into the trash with one rename. Returns True if it was moved."""
+    target_path = trash_path(file_path)
+    full_path = absolute_path(file_path)
+    if target_path is None or not os.path.exists(full_path):
+        return False
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    os.replace(full_path, target_path)
+    return True
+
+
+def restore_from_trash(file_path):
+    """
+    Puts a trashed PDF back at file_path. If identical contents were stored
+    there again meanwhile, the trashed copy is simply dropped.
+    """
+    source_path = trash_path(file_path)
+    if source_path is None or not os.path.exists(source_path):
+        return
+    full_path = absolute_path(file_path)
+    if os.path.exists(full_path):
+        os.remove(source_path)
+    else:
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.replace(source_path, full_path)
+
+
+def purge_from_trash(file_path):
+    """Deletes the trashed copy of file_path, if there is one (and its folder once empty)."""
+    target_path = trash_path(file_path)
+    if target_path and os.path.exists(target_path):
+        os.remove(target_path)
+        try:
+            os.rmdir(os.path.dirname(target_path))
+        except OSError:
+            pass  # other trashed files are still in it
+
+
+def safe_name(text, default):
+    """
+    text as a single file or folder name: path separators and characters
+    Windows rejects become "_", and leading/trailing dots and spaces are
+    dropped (so ".." can't climb out of a folder). default if nothing is left.
+    """
+    name = re.sub(r'[\\/*?:"<>|\r\n]', "_", str(text or "")).strip(" .")
+    return name[:150] or default
+
+
+def export_filename(title, file_path):
+    """A readable file name for a stored PDF: its title for content-addressed files."""
+    if _is_inside(absolute_path(file_path), STORE_DIR):
+        return f"{safe_name(title, 'thesis')}.pdf"
+    return os.path.basename(file_path)
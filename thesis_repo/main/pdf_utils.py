@@ -0,0 +1,87 @@
+import os
+import re
+import fitz  # PyMuPDF
+
+# Stored in theses.abstract_page when a PDF has been scanned but has no abstract page
+NO_ABSTRACT_PAGE = -1
+
+ABSTRACT_PATTERN = re.compile(r'\babstract\b', re.IGNORECASE)
+NAME_PATTERN = re.compile(r'([A-Z][\wñÑáéíóúüÁÉÍÓÚÜ\-]*, [A-Z][a-zA-ZñÑáéíóúüÁÉÍÓÚÜ\-]+)')
+YEAR_PATTERN = re.compile(r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{4})\b')
+
+
+def find_abstract_page(doc):
+    """
+    Returns the index of the first page containing the word 'abstract',
+    or None if there isn't one. Accepts an open fitz document or a file path.
+    """
+    if isinstance(doc, str):
+        with fitz.open(doc) as opened:
+            return find_abstract_page(opened)
+
+    for i in range(len(doc)):
+        page_text = doc[i].get_text().strip()
+        if page_text and ABSTRACT_PATTERN.search(page_text):
+            return i
+    return None
+
+
+def title_from_filename(file_path):
+    """Builds a thesis title from a PDF's file name, e.g. 'my_thesis.pdf' -> 'MY THESIS'."""
+    pdf_name = os.path.splitext(os.path.basename(file_path))[0]
+
+    # Convert underscores to spaces and clean
+    natural_title = pdf_name.replace('_', ' ')
+    return re.sub(r'[\\/*?:"<>|\r\n]', "", natural_title).strip().upper()
+
+
+def extract_pdf_metadata(file_path):
+    """
+    Reads a thesis PDF and guesses its metadata.
+    Returns a dict with title, authors, year, abstract_page and abstract_text
+    (the text used for keyword extraction).
+    """
+    with fitz.open(file_path) as doc:
+        # --- Authors: only first page ---
+        first_page_text = doc[0].get_text()
+        name_lines = NAME_PATTERN.findall(first_page_text)
+        filtered_names = [name for name in name_lines if "Cainta" not in name and "Rizal" not in name]
+        authors = ", ".join(filtered_names)
+
+        # --- Year: look in first page only ---
+        year_match = YEAR_PATTERN.search(first_page_text)
+        year = year_match.group(1) if year_match else ""
+
+        # --- Abstract for keyword extraction: find the page containing 'Abstract'
+        abstract_page_index = find_abstract_page(doc)
+
+        # Get text for keywords
+        if abstract_page_index is not None:
+            pages_to_extract = [abstract_page_index]
+            if abstract_page_index + 1 < len(doc):
+                pages_to_extract.append(abstract_page_index + 1)
+            page_texts = [doc[i].get_text().strip() for i in pages_to_extract]
+            abstract_text = "\n".join([text for text in page_texts if text])
+        else:
+            # fallback: first two non-empty pages
+            abstract_text = ""
+            for i in range(len(doc)):
+                page_text = doc[i].get_text().strip()
+                if page_text:
+                    abstract_text += page_text + "\n"
+                if abstract_text.count("\n") >= 2:  # approx 2 pages of text
+                    break
+
+    return {
+        "title": title_from_filename(file_path),
+        "authors": authors,
+        "year": year,
+        "abstract_page": abstract_page_index,
+        "abstract_text": abstract_text,
+    }
+
+
+def abstract_page_for_db(pdf_path):
+    """Scans a PDF and returns the value to store in theses.abstract_page."""
+    index = find_abstract_page(pdf_path)
+    return NO_ABSTRACT_PAGE if index is None else index
@@ -3,12 +3,128 @@ from tkinter import ttk, messagebox
 from PIL import Image, ImageTk
 import sqlite3
 import os
+import queue
+import threading
 import subprocess
+from migrations import migrate
+from virtual_tree import VirtualTreeview
+from trigram_search import TRIGRAM_TABLE, has_trigram_index, phrase, query_trigrams, fuzzy_query
 
 DB_FILE = "thesis_repository.db"
 SEAL_PATH = "image.png"
 THESIS_FILES_DIR = "thesis_files"
 
+# Wait this long after the last keystroke before searching
+SEARCH_DELAY_MS = 250
+
+
+class SearchWorker:
+    """
+    Runs search queries on a background thread with its own connection, so
+    typing never waits for SQLite.
+
+    Only the newest search matters: submitting a new one interrupts the query
+    in flight (SQLite's progress handler aborts it) and skips any that are
+    still waiting. Results are handed to on_results(rows) on the Tk thread,
+    by polling with after(), since Tk must not be called from other threads.
+    """
+    def __init__(self, widget, db_path, on_results, on_error=None, poll_ms=30):
+        self.widget = widget
+        self.db_path = db_path
+        self.on_results = on_results
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+        self._generation = 0  # number of the newest search submitted
+        self._delivered = 0  # number of the newest search whose results were shown
+        self._running = 0  # number of the search the worker is executing
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._polling = False
+        self._thread = threading.Thread(target=self._run, name="search-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, sql, params, fallbacks=()):
+        """
+        Queues a search; rows must be (key, column, column, ...). If it finds
+        nothing, each fallback is tried in turn: a (sql, params) pair, or a
+        function of the worker's connection returning one (or None to skip).
+        """
+        self._generation += 1
+        self._requests.put((self._generation, [(sql, params)] + list(fallbacks)))
+        self._schedule_poll()
+
+    def close(self):
+        self._generation += 1  # interrupts the running query
+        self._requests.put(None)
+
+    # ---------------- Worker side ---------------- #
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        # Called every 1000 SQLite instructions; a non-zero return aborts the query
+        conn.set_progress_handler(lambda: int(self._running != self._generation), 1000)
+        try:
+            while True:
+                request = self._requests.get()
+                # Skip straight to the newest request
+                while request is not None:
+                    try:
+                        request = self._requests.get_nowait()
+                    except queue.Empty:
+                        break
+                if request is None:
+                    break
+
+                generation, queries = request
+                if generation != self._generation:
+                    continue
+                self._running = generation
+                try:
+                    for query in queries:
+                        if callable(query):
+                            query = query(conn)
+                            if query is None:
+                                continue
+                        sql, params = query
+                        rows = [(row[0], row[1:]) for row in conn.execute(sql, params)]
+                        if rows:
+                            break
+                except Exception as e:
+                    # Not only sqlite3.Error: a fallback function may fail too, and
+                    # letting it escape would end this thread and every later search
+                    if generation == self._generation:
+                        self._results.put((generation, None, e))
+                    continue  # otherwise it was interrupted by a newer search
+                self._results.put((generation, rows, None))
+        finally:
+            conn.close()
+
+    # ---------------- Tk side ---------------- #
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        if not self.widget.winfo_exists():
+            return  # the window was closed
+        while True:
+            try:
+                generation, rows, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation:
+                continue  # stale: a newer search was submitted meanwhile
+            self._delivered = generation
+            if error is not None:
+                if self.on_error:
+                    self.on_error(error)
+            else:
+                self.on_results(rows)
+
+        if self._delivered != self._generation:
+            self._schedule_poll()
+
 class ThesisSearchApp(tk.Frame):
     """
     Main application class for the Thesis Repository Search.
@@ -16,6 +132,8 @@ class ThesisSearchApp(tk.Frame):
     """
     def __init__(self, parent):
         super().__init__(parent)
+        migrate(DB_FILE)
+        self.trigram_search = self.check_trigram_search()
         self.parent = parent
         self.pack(fill="both", expand=True)
 
@@ -122,9 +240,10 @@ class ThesisSearchApp(tk.Frame):
         self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=20)
         self.tree.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
 
-        tree_scroll = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        tree_scroll = ttk.Scrollbar(table_frame, orient="vertical")
         tree_scroll.pack(side=tk.RIGHT, fill="y")
-        self.tree.configure(yscrollcommand=tree_scroll.set)
+        # Only the rows on screen are created as Tk items
+        self.results = VirtualTreeview(self.tree, tree_scroll)
 
         # Styling
         style = ttk.Style()
@@ -154,6 +273,14 @@ class ThesisSearchApp(tk.Frame):
 
         self.tree.bind("<Double-1>", self.open_pdf)
 
+        # Live search: queries run on a worker thread, a few ms after the last change
+        self.search_worker = SearchWorker(self, DB_FILE, self.show_results, self.show_search_error)
+        self.pending_search = None
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
+        self.course_filter.bind("<<ComboboxSelected>>", self.perform_search)
+        self.year_filter.bind("<<ComboboxSelected>>", self.perform_search)
+        self.bind("<Destroy>", lambda e: self.search_worker.close() if e.widget is self else None)
+
         # Initial search
         self.perform_search()
 
@@ -171,50 +298,79 @@ class ThesisSearchApp(tk.Frame):
         except Exception:
             return ["All"]
 
+    def check_trigram_search(self):
+        try:
+            conn = self.connect_db()
+            try:
+                return has_trigram_index(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return False
+
+    def schedule_search(self):
+        """Debounces typing: searches once the user pauses for SEARCH_DELAY_MS."""
+        if self.pending_search is not None:
+            self.after_cancel(self.pending_search)
+        self.pending_search = self.after(SEARCH_DELAY_MS, self.perform_search)
+
     def perform_search(self, event=None):
+        if self.pending_search is not None:
+            self.after_cancel(self.pending_search)
+            self.pending_search = None
+
         search_text = self.search_var.get().strip()
         course = self.course_var.get()
         year = self.year_var.get()
 
-        query = "SELECT thesis_id, title, course, year, keywords, file_path, date_uploaded FROM theses WHERE 1=1"
-        params = []
-
-        if search_text:
-            query += " AND (title LIKE ? OR keywords LIKE ? OR authors LIKE ?)"
-            like = f"%{search_text}%"
-            params.extend([like, like, like])
-
+        filters = ""
+        filter_params = []
         if course != "All":
-            query += " AND course=?"
-            params.append(course)
+            filters += " AND t.course=?"
+            filter_params.append(course)
 
         if year != "All":
-            query += " AND year=?"
-            params.append(year)
+            filters += " AND t.year=?"
+            filter_params.append(year)
+
+        columns = "t.thesis_id, t.title, t.course, t.year"
+        fallbacks = []
+        if search_text and query_trigrams(search_text):
+            # Nothing contains the text as typed: show the closest spellings instead
+            def fuzzy_search(conn):
+                match = fuzzy_query(conn, search_text)
+                if not match:
+                    return None
+                return (f"SELECT {columns} FROM theses_fts JOIN theses t ON t.thesis_id = theses_fts.rowid "
+                        f"WHERE theses_fts MATCH ?{filters} ORDER BY bm25(theses_fts, 10.0, 5.0, 3.0, 1.0)",
+                        [match] + filter_params)
+            fallbacks.append(fuzzy_search)
+
+        if search_text and self.trigram_search and len(search_text) >= 3:
+            # Same matches as LIKE '%text%' on title, keywords and authors, but from the trigram index
+            query = (f"SELECT {columns} FROM {TRIGRAM_TABLE} JOIN theses t ON t.thesis_id = {TRIGRAM_TABLE}.rowid "
+                     f"WHERE {TRIGRAM_TABLE} MATCH ?{filters}")
+            params = [phrase(search_text)] + filter_params
+        elif search_text:
+            query = f"SELECT {columns} FROM theses t WHERE (t.title LIKE ? OR t.keywords LIKE ? OR t.authors LIKE ?){filters}"
+            like = f"%{search_text}%"
+            params = [like, like, like] + filter_params
+        else:
+            query = f"SELECT {columns} FROM theses t WHERE 1=1{filters}"
+            params = filter_params
 
-        conn = self.connect_db()
-        cur = conn.cursor()
-        cur.execute(query, params)
-        results = cur.fetchall()
-        conn.close()
+        self.search_worker.submit(query, params, fallbacks)
 
-        # clear previous rows
-        for row in self.tree.get_children():
-            self.tree.delete(row)
+    def show_results(self, rows):
+        # Rows that were already listed keep their place and selection
+        self.results.update_rows(rows)
 
-        # insert new filtered rows
-        for index, row in enumerate(results):
-            thesis_id, title, course, year, keywords, file_path, date_uploaded = row
-            tag = "evenrow" if index % 2 == 0 else "oddrow"
-            self.tree.insert(
-                "", tk.END, iid=thesis_id,
-                values=(title, course, year),
-                tags=(tag,)
-            )
+    def show_search_error(self, error):
+        messagebox.showerror("Search Error", f"Search failed:\n{error}")
 
 
     def open_pdf(self, event):
-        selected_item_id = self.tree.focus()
+        selected_item_id = self.results.key_for_item(self.tree.focus())
         if not selected_item_id:
             return
 
@@ -20,41 +20,90 @@ document.addEventListener("DOMContentLoaded", () => {
       filterContainer.innerHTML += `<span class="filter-chip">📅 ${year}</span>`;
   }
 
-  function fetchResults() {
-    const query = searchInput.value.trim();
-    const course = filterCourse.value;
-    const year = filterYear.value;
+  // --- Paged results (infinite scroll) ---
+  const tableContainer = document.querySelector(".table-container");
+  const sentinel = document.getElementById("scroll-sentinel");
+  const PAGE_SIZE = 50;
+  let nextCursor = null;
+  let loading = false;
+  let searchGeneration = 0;
 
-    updateFiltersDisplay();
+  function buildSearchUrl(cursor) {
+    const params = new URLSearchParams({
+      query: searchInput.value.trim(),
+      course: filterCourse.value,
+      year: filterYear.value,
+      limit: PAGE_SIZE,
+    });
+    if (cursor) params.set("cursor", cursor);
+    return `/api/search?${params.toString()}`;
+  }
 
-    fetch(
-      `/api/search?query=${encodeURIComponent(query)}&course=${encodeURIComponent(
-        course
-      )}&year=${encodeURIComponent(year)}`
-    )
+  function appendRows(results) {
+    const fragment = document.createDocumentFragment();
+    results.forEach((d) => {
+      const row = document.createElement("tr");
+      row.innerHTML = `
+        <td>${d.title}</td>
+        <td>${d.course}</td>
+        <td>${d.year || "-"}</td>
+        <td>${d.date_uploaded}</td>
+      `;
+      row.addEventListener("click", () => showDetailModal(d));
+      fragment.appendChild(row);
+    });
+    resultBody.appendChild(fragment);
+  }
+
+  function loadPage(cursor) {
+    // Responses for an older search (filters changed meanwhile) are dropped
+    const generation = searchGeneration;
+    loading = true;
+
+    return fetch(buildSearchUrl(cursor))
       .then((res) => res.json())
       .then((data) => {
-        resultBody.innerHTML = "";
-        if (data.length === 0) {
+        if (generation !== searchGeneration) return;
+        if (!cursor) resultBody.innerHTML = "";
+        if (!cursor && data.results.length === 0) {
           resultBody.innerHTML = `<tr><td colspan="4" style="text-align:center;color:gray;padding:15px;">No results found.</td></tr>`;
-          return;
         }
-
-        data.forEach((d) => {
-          const row = document.createElement("tr");
-          row.innerHTML = `
-            <td>${d.title}</td>
-            <td>${d.course}</td>
-            <td>${d.year || "-"}</td>
-            <td>${d.date_uploaded}</td>
-          `;
-          row.addEventListener("click", () => showDetailModal(d));
-          resultBody.appendChild(row);
-        });
+        // Nothing matched exactly, so these are the closest spellings
+        if (!cursor && data.mode === "fuzzy" && data.results.length > 0) {
+          filterContainer.innerHTML += `<span class="filter-chip">≈ Similar matches</span>`;
+        }
+        appendRows(data.results);
+        nextCursor = data.next_cursor;
       })
-      .catch((err) => console.error("Error fetching results:", err));
+      .catch((err) => console.error("Error fetching results:", err))
+      .finally(() => {
+        if (generation !== searchGeneration) return;
+        loading = false;
+        // Keep filling until the container can scroll
+        if (nextCursor && tableContainer.scrollHeight <= tableContainer.clientHeight) {
+          loadPage(nextCursor);
+        }
+      });
   }
 
+  function fetchResults() {
+    updateFiltersDisplay();
+    searchGeneration += 1;
+    nextCursor = null;
+    tableContainer.scrollTop = 0;
+    loadPage(null);
+  }
+
+  // Load the next page when the bottom of the table scrolls into view
+  new IntersectionObserver(
+    (entries) => {
+      if (entries[0].isIntersecting && nextCursor && !loading) {
+        loadPage(nextCursor);
+      }
+    },
+    { root: tableContainer, rootMargin: "200px" }
+  ).observe(sentinel);
+
   // --- Detail modal setup ---
   const detailModal = document.getElementById("detail-modal");
   const modalTitle = document.getElementById("modal-title");
@@ -64,6 +113,8 @@ document.addEventListener("DOMContentLoaded", () => {
   const modalKeywords = document.getElementById("modal-keywords");
   const modalAbstractContainer = document.getElementById("modal-abstract-container");
   const closeModalBtn = document.getElementById("close-modal");
+  const NO_ABSTRACT = `<p style="color:gray;">No abstract image available.</p>`;
+  let modalThesis = null;
 
   // --- Show modal details ---
   function showDetailModal(data) {
@@ -75,30 +126,56 @@ document.addEventListener("DOMContentLoaded", () => {
 
     // Clear previous abstract images
     modalAbstractContainer.innerHTML = "";
-    if (data.pdf_path) {
-      fetch(`/get_abstract_image?pdf=${encodeURIComponent(data.pdf_path)}`)
-        .then((res) => res.json())
-        .then((json) => {
-          if (json.images && json.images.length > 0) {
-            json.images.forEach((base64Img) => {
-              const img = document.createElement("img");
-              img.src = `data:image/png;base64,${base64Img}`;
-              img.alt = "Abstract page";
-              img.style.width = "100%";
-              img.style.marginBottom = "10px";
-              modalAbstractContainer.appendChild(img);
-            });
-          } else {
-            modalAbstractContainer.innerHTML = `<p style="color:gray;">No abstract image available.</p>`;
-          }
-        })
-        .catch((err) => {
-          console.error("Error loading abstract images:", err);
-          modalAbstractContainer.innerHTML = `<p style="color:gray;">No abstract image available.</p>`;
+    const shownThesis = data.thesis_id;
+    modalThesis = shownThesis;
+    fetch(`/thesis/${data.thesis_id}/abstract`)
+      .then((res) => (res.ok ? res.json() : { pages: [] }))
+      .then((json) => {
+        if (modalThesis !== shownThesis) return; // another thesis was opened meanwhile
+        if (!json.pages || json.pages.length === 0) {
+          modalAbstractContainer.innerHTML = NO_ABSTRACT;
+          return;
+        }
+        json.pages.forEach((page) => {
+          // The small preview arrives quickly; the sharp image replaces it once loaded
+          const img = document.createElement("img");
+          img.alt = "Abstract page";
+          img.style.width = "100%";
+          img.style.marginBottom = "10px";
+          let showingFull = false;
+          // A preview that fails to load falls back to the sharp image, then to the message
+          img.addEventListener("error", () => {
+            if (modalThesis !== shownThesis) return;
+            if (showingFull) {
+              img.outerHTML = NO_ABSTRACT;
+            } else {
+              showingFull = true;
+              img.src = page.full;
+            }
+          });
+          img.addEventListener(
+            "load",
+            () => {
+              if (showingFull) return;
+              const full = new Image();
+              full.onload = () => {
+                if (modalThesis === shownThesis) {
+                  showingFull = true;
+                  img.src = page.full;
+                }
+              };
+              full.src = page.full;
+            },
+            { once: true }
+          );
+          img.src = page.preview;
+          modalAbstractContainer.appendChild(img);
         });
-    } else {
-      modalAbstractContainer.innerHTML = `<p style="color:gray;">No abstract image available.</p>`;
-    }
+      })
+      .catch((err) => {
+        console.error("Error loading abstract images:", err);
+        modalAbstractContainer.innerHTML = NO_ABSTRACT;
+      });
 
     detailModal.classList.add("active");
   }
@@ -0,0 +1,76 @@
+import io
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from disk_cache import DiskCache
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Thumbnails that were rendered recently stay in memory, the rest on disk
+MEMORY_ENTRIES = 64
+DISK_CACHE = DiskCache(os.path.join(PROJECT_DIR, "thumbnail_cache"), 100 * 1024 * 1024)
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+
+
+def thumbnail_key(pdf_path, width, height, keep_aspect):
+    """Cache key for a rendered first page; changes whenever the PDF is modified."""
+    stat = os.stat(pdf_path)
+    raw = f"{os.path.abspath(pdf_path)}|{stat.st_mtime_ns}|{stat.st_size}|{width}x{height}|{int(keep_aspect)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def render_first_page(pdf_path, width, height, keep_aspect=False):
+    """
+    Renders page 0 straight at the requested size. With keep_aspect the page
+    is scaled to fit inside width x height, otherwise it is stretched to fill it.
+    """
+    with fitz.open(pdf_path) as doc:
+        page = doc.load_page(0)
+        zoom_x = width / page.rect.width
+        zoom_y = height / page.rect.height
+        if keep_aspect:
+            zoom_x = zoom_y = min(zoom_x, zoom_y)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom_x, zoom_y), alpha=False)
+        return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+
+def get_thumbnail(pdf_path, width, height, keep_aspect=False):
+    """
+    Returns the first page of a PDF as a PIL image, from memory, from the
+    thumbnail cache folder, or freshly rendered (in that order).
+    """
+    key = thumbnail_key(pdf_path, width, height, keep_aspect)
+
+    with _lock:
+        image = _memory.get(key)
+        if image is not None:
+            _memory.move_to_end(key)
+            return image
+
+    data = DISK_CACHE.read(f"{key}.png")
+    if data is not None:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    else:
+        image = render_first_page(pdf_path, width, height, keep_aspect)
+        buffer = io.BytesIO()
+        # Fast compression: these files are written often and are only read locally
+        image.save(buffer, format="PNG", compress_level=1)
+        try:
+            DISK_CACHE.put(f"{key}.png", buffer.getvalue())
+        except OSError as e:
+            print(f"Could not cache thumbnail: {e}")
+
+    with _lock:
+        _memory[key] = image
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+    return image
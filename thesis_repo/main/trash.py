@@ -0,0 +1,143 @@
+import json
+import sqlite3
+import argparse
+
+from migrations import DB_PATH, migrate
+import pdf_store
+
+# Deleted theses can be restored for this long, then sweep_trash removes them for good
+TRASH_RETENTION_SECONDS = 7 * 24 * 3600
+
+
+def _ids_param(thesis_ids):
+    # One parameter for any number of ids: ... IN (SELECT value FROM json_each(?))
+    return json.dumps([int(thesis_id) for thesis_id in thesis_ids])
+
+
+def delete_theses(conn, thesis_ids):
+    """
+    Deletes theses as one batch and returns its batch_id (for undo_delete),
+    or None if none of the ids exist.
+
+    Everything happens under the write lock (BEGIN IMMEDIATE), so two deletes
+    can't pick the same batch_id. The rows move to 'theses_trash', then the
+    PDFs no remaining thesis uses move to thesis_files/trash (one rename
+    each), and only then is the transaction committed, so no save can start
+    using one of those PDFs in between. If the commit fails, the PDFs move back.
+    """
+    ids = _ids_param(thesis_ids)
+    moved = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = conn.execute("SELECT * FROM theses WHERE thesis_id IN (SELECT value FROM json_each(?))", (ids,))
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor]
+        if not rows:
+            conn.rollback()
+            return None
+        batch_id = conn.execute("SELECT coalesce(max(batch_id), 0) + 1 FROM theses_trash").fetchone()[0]
+        conn.executemany(
+            "INSERT OR REPLACE INTO theses_trash (thesis_id, batch_id, file_path, row) VALUES (?, ?, ?, ?)",
+            [(row["thesis_id"], batch_id, row["file_path"], json.dumps(row)) for row in rows]
+        )
+        conn.execute("DELETE FROM theses WHERE thesis_id IN (SELECT value FROM json_each(?))", (ids,))
+
+        unused = conn.execute('''
+            SELECT DISTINCT file_path FROM theses_trash
+            WHERE batch_id = ? AND file_path NOT IN (SELECT file_path FROM theses)
+        ''', (batch_id,)).fetchall()
+        for (file_path,) in unused:
+            try:
+                pdf_store.move_to_trash(file_path)
+                moved.append(file_path)
+            except OSError as e:
+                # Left in place; sweep_trash deletes it once the batch expires
+                print(f"Could not move {file_path} to the trash: {e}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        for file_path in moved:
+            pdf_store.restore_from_trash(file_path)
+        raise
+    return batch_id
+
+
+def undo_delete(conn, batch_id):
+    """Restores every thesis of a batch from the trash, with its PDF. Returns how many were restored."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(theses)")}
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        trashed = conn.execute("SELECT row FROM theses_trash WHERE batch_id = ?", (batch_id,)).fetchall()
+        for (row_json,) in trashed:
+            # Columns added after the row was deleted keep their defaults
+            row = {name: value for name, value in json.loads(row_json).items() if name in columns}
+            names = ", ".join(row)
+            placeholders = ", ".join("?" for _ in row)
+            conn.execute(f"INSERT INTO theses ({names}) VALUES ({placeholders})", list(row.values()))
+        conn.execute("DELETE FROM theses_trash WHERE batch_id = ?", (batch_id,))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    file_paths = {json.loads(row_json)["file_path"] for (row_json,) in trashed}
+    for file_path in file_paths:
+        try:
+            pdf_store.restore_from_trash(file_path)
+        except OSError as e:
+            print(f"Could not restore {file_path} from the trash: {e}")
+    return len(trashed)
+
+
+def sweep_trash(conn, retention_seconds=TRASH_RETENTION_SECONDS):
+    """
+    Permanently deletes theses that have been in the trash longer than
+    retention_seconds, and their PDFs unless another thesis (live or still
+    in the trash) uses them. Returns how many were removed.
+    """
+    cutoff = f"-{int(retention_seconds)} seconds"
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        expired = conn.execute(
+            "SELECT DISTINCT file_path FROM theses_trash WHERE deleted_at <= datetime('now', ?)", (cutoff,)
+        ).fetchall()
+        removed = conn.execute("DELETE FROM theses_trash WHERE deleted_at <= datetime('now', ?)", (cutoff,)).rowcount
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    for (file_path,) in expired:
+        if conn.execute("SELECT 1 FROM theses_trash WHERE file_path = ? LIMIT 1", (file_path,)).fetchone():
+            continue  # still needed if that thesis is restored
+        try:
+            pdf_store.purge_from_trash(file_path)
+            # A PDF that was never moved (see delete_theses), if nothing uses it any more
+            pdf_store.release_file(conn, file_path)
+        except OSError as e:
+            print(f"Could not delete {file_path}: {e}")
+    return removed
+
+
+def last_batch(conn):
+    """(batch_id, thesis count) of the most recent delete still in the trash, or None."""
+    row = conn.execute('''
+        SELECT batch_id, COUNT(*) FROM theses_trash
+        WHERE batch_id = (SELECT max(batch_id) FROM theses_trash)
+    ''').fetchone()
+    return row if row and row[0] is not None else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Permanently delete theses that have been in the trash for a while.")
+    parser.add_argument("--days", type=float, default=TRASH_RETENTION_SECONDS / 86400,
+                        help="Keep deleted theses this many days (0 empties the trash)")
+    parser.add_argument("--db", default=DB_PATH, help="Path to thesis_repository.db")
+    args = parser.parse_args()
+
+    migrate(args.db)
+    conn = sqlite3.connect(args.db, timeout=10.0)
+    try:
+        print(f"🗑️ Removed {sweep_trash(conn, args.days * 86400)} theses from the trash.")
+    finally:
+        conn.close()
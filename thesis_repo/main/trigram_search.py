@@ -0,0 +1,127 @@
+import re
+import threading
+from collections import Counter
+
+# Created by migrations.create_trigram_index when SQLite has the trigram
+# tokenizer (3.34+). It indexes every 3-character substring of title,
+# authors and keywords, so "catechet" or "commerce" is found inside a word
+# without a LIKE '%...%' scan of the whole table.
+TRIGRAM_TABLE = "theses_trigram"
+TRIGRAM_BM25 = "bm25(theses_trigram, 10.0, 5.0, 3.0)"
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Fuzzy search replaces each word by its closest spellings in the titles,
+# authors and keywords: at most this many, at least this similar (Dice
+# coefficient of their padded trigrams; one typo is usually about 0.7)
+FUZZY_MAX_WORDS = 3
+FUZZY_MIN_SIMILARITY = 0.5
+
+
+def has_trigram_index(conn):
+    """True if the database has the trigram table (older SQLite builds can't create it)."""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (TRIGRAM_TABLE,)).fetchone()
+    return row is not None
+
+
+def phrase(text):
+    """Quotes text as one FTS5 phrase."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def substring_query(text):
+    """
+    MATCH expression for the trigram table requiring every word of text to
+    occur somewhere (in any column), e.g. 'catechet' or 'e-commerce'. Words
+    shorter than 3 characters have no trigram and are left out; returns ""
+    if nothing is left.
+    """
+    return " AND ".join(phrase(word) for word in text.split() if len(word) >= 3)
+
+
+def query_trigrams(text):
+    """Distinct lowercase trigrams of the words of text, in order."""
+    trigrams = []
+    for word in WORD_PATTERN.findall(text.lower()):
+        for start in range(len(word) - 2):
+            trigram = word[start:start + 3]
+            if trigram not in trigrams:
+                trigrams.append(trigram)
+    return trigrams
+
+
+def word_trigrams(word):
+    """Trigrams of word padded like PostgreSQL's pg_trgm ('  word '), so its ends count too."""
+    padded = f"  {word} "
+    return {padded[start:start + 3] for start in range(len(padded) - 2)}
+
+
+class WordVocabulary:
+    """
+    Every distinct word of the titles, authors and keywords, indexed by its
+    trigrams, for finding the closest spellings of a mistyped word.
+
+    Only distinct words are compared, so a lookup costs about the same for
+    1,000 theses as for 100,000. The words are read again only after the
+    'theses_changes' counter moved (see migrations.create_change_counter).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._trigrams_by_word = {}
+        self._words_by_trigram = {}
+
+    def similar_words(self, conn, word, limit=FUZZY_MAX_WORDS):
+        """The closest spellings of word, most similar first."""
+        trigrams = word_trigrams(word)
+        with self._lock:
+            self._refresh(conn)
+            shared = Counter()
+            for trigram in trigrams:
+                shared.update(self._words_by_trigram.get(trigram, ()))
+            scored = []
+            for candidate, count in shared.items():
+                similarity = 2 * count / (len(trigrams) + len(self._trigrams_by_word[candidate]))
+                if similarity >= FUZZY_MIN_SIMILARITY:
+                    scored.append((-similarity, candidate))
+        return [candidate for _, candidate in sorted(scored)[:limit]]
+
+    def _refresh(self, conn):
+        version = conn.execute("SELECT version FROM theses_changes WHERE id = 1").fetchone()[0]
+        if version == self._version:
+            return
+        words = set()
+        for row in conn.execute("SELECT title || ' ' || coalesce(authors, '') || ' ' || coalesce(keywords, '') FROM theses"):
+            words.update(WORD_PATTERN.findall(row[0].lower()))
+        trigrams_by_word = {word: word_trigrams(word) for word in words}
+        words_by_trigram = {}
+        for word, trigrams in trigrams_by_word.items():
+            for trigram in trigrams:
+                words_by_trigram.setdefault(trigram, []).append(word)
+        self._trigrams_by_word = trigrams_by_word
+        self._words_by_trigram = words_by_trigram
+        self._version = version
+
+
+VOCABULARY = WordVocabulary()
+
+
+def fuzzy_query(conn, text):
+    """
+    MATCH expression for 'theses_fts' that finds text despite typos, e.g.
+    'catechsis' -> title, authors or keywords containing ("catechesis" OR
+    "catechetical"). Every word of text must match one of its spellings.
+    Returns "" if some word has no similar spelling at all.
+    """
+    terms = []
+    for word in WORD_PATTERN.findall(text.lower()):
+        if len(word) < 3:
+            terms.append(f"{phrase(word)}*")  # too short to misspell; match as a prefix
+            continue
+        spellings = VOCABULARY.similar_words(conn, word)
+        if not spellings:
+            return ""
+        terms.append("(" + " OR ".join(phrase(spelling) for spelling in spellings) + ")")
+    if not terms:
+        return ""
+    return "{title authors keywords} : (" + " AND ".join(terms) + ")"
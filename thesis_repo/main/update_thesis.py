@@ -2,70 +2,42 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import sqlite3
 import os
-import shutil
 import re
-from PIL import Image, ImageTk
+from PIL import ImageTk
 import fitz # PyMuPDF
-from keybert import KeyBERT
-from PyPDF2 import PdfReader, PdfWriter
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-import io
-import tempfile
+from pdf_utils import abstract_page_for_db
+from migrations import migrate
+from watermark import add_watermark, WATERMARK_VERSION
+import keywords as keyword_model
+from thumbnails import get_thumbnail
+from virtual_tree import VirtualTreeview
+from filter_index import FilterIndex
+import pdf_store
 
 # Global setup
 # Define DB_PATH relative to the script's directory
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thesis_repository.db")
 
-# Initialize KeyBERT, handling potential errors if dependencies are missing
-try:
-    kw_model = KeyBERT()
-except Exception as e:
-    # KeyBERT requires certain NLP models/libraries, this handles failure gracefully
-    print(f"KeyBERT failed to initialize: {e}. Keyword extraction will be disabled.")
-    kw_model = None
-
 # ---------------- Database Init ---------------- #
 def init_db():
-    """Initializes the SQLite database and ensures the directory structure exists."""
+    """Ensures the directory structure exists and brings the database schema up to date."""
     # Ensure the parent directory for the DB and file storage exists
     os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
     
-    conn = None
     try:
-        # Connect to DB with a timeout and enable Write-Ahead Logging (WAL) for better concurrency
-        conn = sqlite3.connect(DB_PATH, timeout=10.0)
-        conn.execute("PRAGMA journal_mode=WAL")
-        c = conn.cursor()
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS theses (
-                thesis_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                authors TEXT NOT NULL,
-                course TEXT NOT NULL,
-                year INTEGER NOT NULL,
-                keywords TEXT,
-                file_path TEXT NOT NULL,
-                date_uploaded DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
+        # Creates the tables and indexes on a new database (see migrations.py)
+        migrate(DB_PATH)
     except Exception as e:
         print(f"Database initialization error: {e}")
         messagebox.showerror("DB Error", f"Database initialization failed: {e}")
-    finally:
-        if conn:
-            conn.close()
 
 # ---------------- Keyword Extraction ---------------- #
 def extract_keywords(text, num_keywords=5):
-    """Extracts keywords from text using KeyBERT."""
-    if not kw_model:
-        return "Keyword model unavailable."
+    """Extracts keywords from text using the shared KeyBERT model (cached by content)."""
     try:
-        keywords = kw_model.extract_keywords(text, keyphrase_ngram_range=(1, 2),
-                                             stop_words='english', top_n=num_keywords)
-        return ", ".join([kw[0] for kw in keywords])
+        return keyword_model.extract_keywords(text, num_keywords)
+    except RuntimeError:
+        return "Keyword model unavailable."
     except Exception as e:
         print(f"Keyword extraction failed: {e}")
         return "Extraction failed."
@@ -74,25 +46,14 @@ def extract_keywords(text, num_keywords=5):
 def preview_pdf_first_page(pdf_path, pdf_label):
     """Loads the first page of a PDF, converts it to an image, and displays it."""
     try:
-        doc = fitz.open(pdf_path)
-        page = doc.load_page(0)
-        
-        # Increased matrix scale for higher resolution preview
-        matrix = fitz.Matrix(2, 2) 
-        pix = page.get_pixmap(matrix=matrix, alpha=False)
-        
-        # Convert pixmap to PIL Image
-        img_buffer = io.BytesIO(pix.tobytes("ppm"))
-        image = Image.open(img_buffer)
-        image.thumbnail((380, 480))
+        # Rendered to fit 380x480 (cached by path and modification time)
+        image = get_thumbnail(pdf_path, 380, 480, keep_aspect=True)
         
         # Create PhotoImage and store a reference to prevent garbage collection
         photo = ImageTk.PhotoImage(image, master=pdf_label)
         
         pdf_label.config(image=photo, text="")
         pdf_label.image = photo
-        
-        doc.close() # Crucial: Close the document
     except Exception as e:
         pdf_label.config(text=f"Preview Error:\n{str(e)[:50]}", image="")
 
@@ -178,91 +139,68 @@ def save_thesis(title_entry, authors_entry, course_entry, year_entry, file_path_
 
     conn = None
     try:
-        # 1. File management & Copy
-        base_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thesis_files")
-        os.makedirs(base_dir, exist_ok=True)
-        course_folder = os.path.join(base_dir, course.lower())
-        os.makedirs(course_folder, exist_ok=True)
-        
-        # Create a safe, unique filename
-        original_filename = os.path.basename(file_path)
-        safe_filename = re.sub(r'[\\/*?:"<>|\r\n]', "_", original_filename)
-        # Use thesis ID if updating, otherwise use filename
-        if thesis_id:
-            safe_filename = f"{thesis_id}_{safe_filename}"
-        
-        target_path = os.path.join(course_folder, safe_filename)
-        
-        # Copy the original file to the repository if it's new or imported from outside
-        if not os.path.exists(target_path) or file_path != target_path:
-            shutil.copy2(file_path, target_path)
-
-        # 2. Watermark function
-        def add_watermark(input_pdf, output_pdf):
-            """Adds a 'CCC RESEARCH PROPERTY' watermark to every page of the PDF."""
-            packet = io.BytesIO()
-            can = canvas.Canvas(packet, pagesize=letter)
-            page_width, page_height = letter
-            
-            # Draw Watermark Text
-            can.setFont("Helvetica-Bold", 30)
-            can.setFillColorRGB(0.6, 0.6, 0.6)
-            can.saveState()
-            
-            # Rotate and set transparency
-            can.translate(page_width/2 - 150, page_height/2)
-            can.rotate(45)
-            can.setFillAlpha(0.3)
-            can.drawString(0, 0, "CCC RESEARCH PROPERTY")
-            can.restoreState()
-            can.save()
-            packet.seek(0)
-            
-            try:
-                watermark = PdfReader(packet)
-                watermark_page = watermark.pages[0]
-                
-                # Use a temporary file for writing to prevent data loss on failure
-                temp_fd, temp_path = tempfile.mkstemp(suffix=".pdf")
-                os.close(temp_fd)
-
-                with open(input_pdf, "rb") as input_file:
-                    reader = PdfReader(input_file)
-                    writer = PdfWriter()
-                    for page in reader.pages:
-                        # Create a copy of the watermark page for merging (important in PyPDF2)
-                        page.merge_page(watermark_page)
-                        writer.add_page(page)
-                
-                    with open(temp_path, "wb") as output_file:
-                        writer.write(output_file)
-
-                # Atomically replace the original file with the watermarked temporary file
-                shutil.move(temp_path, output_pdf)
-                
-            except Exception as w_err:
-                messagebox.showwarning("Watermark Warning", f"Could not apply watermark. The file was saved without it. Details: {w_err}")
-
-        # Apply watermark to the target file
-        add_watermark(target_path, target_path)
-
-        # 3. Save to DB
+        year = int(year)
         conn = sqlite3.connect(DB_PATH, timeout=10.0)
         conn.execute("PRAGMA journal_mode=WAL")
         c = conn.cursor()
-        
+
+        current = None
         if thesis_id:
-            # Update existing record
-            c.execute('''UPDATE theses SET title=?, authors=?, course=?, year=?, keywords=?, file_path=? WHERE thesis_id=?''',
-                      (title, authors, course, int(year), keywords, target_path, thesis_id))
-            message = "Thesis updated successfully!"
+            c.execute("SELECT file_path FROM theses WHERE thesis_id=?", (thesis_id,))
+            current = c.fetchone()
+
+        stored = pdf_store.stored_copy(conn, file_path)
+        if stored:
+            # 1. A file already in the repository (usually the thesis's own, when only the
+            #    details changed) is watermarked already: the PDF is left as it is
+            stored_path, content_hash, abstract_page, watermark_version = stored
         else:
-            # Insert new record
-            c.execute('''INSERT INTO theses (title, authors, course, year, keywords, file_path) VALUES (?, ?, ?, ?, ?, ?)''',
-                      (title, authors, course, int(year), keywords, target_path))
-            message = "Thesis saved successfully!"
-            
-        conn.commit()
+            # 1. Watermark, applied to the new copy before it is put in place
+            stamped = []
+            def watermark(path):
+                try:
+                    add_watermark(path, path)
+                    stamped.append(WATERMARK_VERSION)
+                except Exception as w_err:
+                    messagebox.showwarning("Watermark Warning", f"Could not apply watermark. The file was saved without it. Details: {w_err}")
+
+            # 2. Copy and hash the file in one pass; a PDF that is already in the repository is kept once
+            content_hash, target_path = pdf_store.ingest_pdf(file_path, prepare=watermark)
+            stored_path = pdf_store.relative_path(target_path)
+            # Identical contents stored before were stamped by whoever stored them
+            watermark_version = stamped[0] if stamped else pdf_store.known_watermark_version(conn, content_hash)
+
+            # Remember where the abstract is so viewers don't have to search for it
+            abstract_page = pdf_store.known_abstract_page(conn, content_hash)
+            if abstract_page is None:
+                try:
+                    abstract_page = abstract_page_for_db(target_path)
+                except Exception as e:
+                    print(f"Abstract page detection failed: {e}")
+
+        # 3. Save to DB, under the write lock so the shared stored file can't be released meanwhile
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            pdf_store.claim_file(stored_path)
+            if thesis_id:
+                # Update existing record
+                c.execute('''UPDATE theses SET title=?, authors=?, course=?, year=?, keywords=?, file_path=?, abstract_page=?, content_hash=?, watermark_version=? WHERE thesis_id=?''',
+                          (title, authors, course, year, keywords, stored_path, abstract_page, content_hash, watermark_version, thesis_id))
+                message = "Thesis updated successfully!"
+            else:
+                # Insert new record
+                c.execute('''INSERT INTO theses (title, authors, course, year, keywords, file_path, abstract_page, content_hash, watermark_version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                          (title, authors, course, year, keywords, stored_path, abstract_page, content_hash, watermark_version))
+                message = "Thesis saved successfully!"
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+        # A replaced file is deleted once no other thesis shares it
+        if current and current[0] != stored_path:
+            pdf_store.release_file(conn, current[0])
+
         messagebox.showinfo("Success", message)
         
         # Reload the main treeview if it's available (assuming this is a Toplevel window)
@@ -285,6 +223,8 @@ def save_thesis(title_entry, authors_entry, course_entry, year_entry, file_path_
 class UpdateThesisApp:
     def __init__(self, master=None):
         init_db()
+        # Start loading the keyword model now so it's ready when a PDF is picked
+        keyword_model.warm_up_in_background()
         self.root = tk.Toplevel(master) if master else tk.Tk()
         self.root.title("📚 Thesis Repository - Update Manager")
         self.root.configure(bg="#ecf0f1")
@@ -292,7 +232,8 @@ class UpdateThesisApp:
         self.root.resizable(False, False)
         
         self.current_thesis_id = None
-        self.all_theses_data = [] # To store all data for in-memory filtering
+        self.filter_index = FilterIndex([]) # Precomputed lookups for in-memory filtering
+        self.theses_by_id = {}
         self.setup_ui()
         self.load_tree_data()
         self.root.mainloop()
@@ -375,13 +316,13 @@ class UpdateThesisApp:
                   foreground=[('selected', 'white')])
         
         self.tree = ttk.Treeview(tree_container, 
-                                 yscrollcommand=tree_scroll.set, 
                                  selectmode="browse", 
                                  columns=("ID", "Title", "Course", "Date"),
                                  style="Custom.Treeview",
                                  show="tree headings")
         self.tree.pack(fill=tk.BOTH, expand=True)
-        tree_scroll.config(command=self.tree.yview)
+        # Only the rows on screen are created as Tk items
+        self.results = VirtualTreeview(self.tree, tree_scroll)
 
         # Configure columns
         self.tree.column("#0", width=0, stretch=tk.NO)
@@ -572,9 +513,6 @@ class UpdateThesisApp:
 
     def load_tree_data(self):
         """Loads data from the database into the Treeview."""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
         conn = None
         try:
             conn = sqlite3.connect(DB_PATH, timeout=10.0)
@@ -583,18 +521,15 @@ class UpdateThesisApp:
             c.execute("SELECT thesis_id, title, course, year, date_uploaded FROM theses ORDER BY date_uploaded DESC")
             rows = c.fetchall()
             
-            # Store all data for filtering
-            self.all_theses_data = rows
+            # Index all data once so filtering doesn't rescan every row per keystroke
+            self.filter_index = FilterIndex(rows)
+            self.theses_by_id = {row[0]: row for row in rows}
             
             # Populate year filter dropdown
             years = sorted(set([str(row[3]) for row in rows]), reverse=True)
             self.filter_year['values'] = ["All"] + years
             
-            for idx, row in enumerate(rows):
-                tag = "evenrow" if idx % 2 == 0 else "oddrow"
-                # Truncate long titles for display
-                title = (row[1][:45] + "...") if len(row[1]) > 48 else row[1]
-                self.tree.insert("", "end", values=(row[0], title, row[2], row[4]), tags=(tag,))
+            self.results.set_source([row[0] for row in rows], self.format_tree_rows)
         except sqlite3.OperationalError as db_err:
             messagebox.showerror("Database Error", f"Cannot access database. It may be locked by another process.\n\nDetails: {db_err}")
         except Exception as e:
@@ -603,33 +538,29 @@ class UpdateThesisApp:
             if conn:
                 conn.close()
 
+    def format_tree_rows(self, thesis_ids):
+        """Builds the displayed values for one page of rows."""
+        rows = {}
+        for thesis_id in thesis_ids:
+            _, title, course, year, date_uploaded = self.theses_by_id[thesis_id]
+            # Truncate long titles for display
+            display_title = (title[:45] + "...") if len(title) > 48 else title
+            rows[thesis_id] = (thesis_id, display_title, course, date_uploaded)
+        return rows
+
     def filter_treeview(self, event=None):
         """Filter treeview based on search text, course, and year"""
         search_text = self.search_entry.get().lower()
         selected_course = self.filter_course.get()
         selected_year = self.filter_year.get()
         
-        # Clear current treeview
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
         # Filter and display
-        idx = 0
-        for row in self.all_theses_data:
-            thesis_id, title, course, year, date_uploaded = row
-            
-            # Apply filters
-            course_match = selected_course == "All" or course == selected_course
-            year_match = selected_year == "All" or str(year) == selected_year
-            search_match = (search_text in title.lower() or 
-                            search_text in course.lower() or 
-                            search_text in str(year))
-            
-            if course_match and year_match and search_match:
-                tag = "evenrow" if idx % 2 == 0 else "oddrow"
-                display_title = (title[:45] + "...") if len(title) > 48 else title
-                self.tree.insert("", "end", values=(thesis_id, display_title, course, date_uploaded), tags=(tag,))
-                idx += 1
+        matches = self.filter_index.filter(
+            search_text,
+            course=None if selected_course == "All" else selected_course,
+            year=None if selected_year == "All" else selected_year
+        )
+        self.results.set_source(matches, self.format_tree_rows)
 
     def load_selected_thesis(self, event=None):
         """Loads data from the selected row into the form fields."""
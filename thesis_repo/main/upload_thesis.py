@@ -2,145 +2,110 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import sqlite3
 import os
-import shutil
 from tkinter import ttk
-from PIL import Image, ImageTk
-import fitz  # PyMuPDF
-import re
-from keybert import KeyBERT
-from PyPDF2 import PdfReader, PdfWriter
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.utils import ImageReader
-import io
-
-
-# Initialize BERT model for keyword extraction.
-kw_model = KeyBERT()
+from PIL import ImageTk
+from pdf_utils import extract_pdf_metadata, abstract_page_for_db
+from migrations import migrate
+from ingest_queue import get_ingest_queue, JobCancelled
+from watermark import add_watermark, WATERMARK_VERSION
+import keywords as keyword_model
+from thumbnails import get_thumbnail
+import pdf_store
+
+
 db_path = os.path.join(os.path.dirname(__file__), "thesis_repository.db")
 
 
 # Initialize the database and table.
 def init_db():
     """
-    Creates the database file and the 'theses' table if they don't already exist.
+    Creates the database file if needed and brings its schema up to date (see migrations.py).
     """
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS theses (
-            thesis_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            authors TEXT NOT NULL,
-            course TEXT NOT NULL,
-            year INTEGER NOT NULL,
-            keywords TEXT,
-            file_path TEXT NOT NULL,
-            date_uploaded DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    migrate(db_path)
 
 
 # Extract keywords using KeyBERT
 def extract_keywords(text, num_keywords=5):
     """
-    Extracts relevant keywords from a given text using the KeyBERT model.
+    Extracts relevant keywords from a given text using the shared KeyBERT model.
     """
     try:
-        keywords = kw_model.extract_keywords(
-            text,
-            keyphrase_ngram_range=(1, 2),
-            stop_words='english',
-            top_n=num_keywords
-        )
-        return ", ".join([kw[0] for kw in keywords])
+        return keyword_model.extract_keywords(text, num_keywords)
     except Exception as e:
         print(f"KeyBERT extraction failed: {e}")
         return ""  # safer fallback
 
 
 def upload_file_wrapper(course_entry, title_entry, file_path_var, pdf_preview_canvas,
-                        authors_entry=None, year_entry=None, keyword_debug_label=None):
+                        authors_entry=None, year_entry=None, keyword_debug_label=None, status_label=None):
     """
     Opens a file dialog to select a PDF and extracts metadata to populate the form.
+    The extraction runs on the background ingest queue so the window stays responsive.
     """
     file_path = filedialog.askopenfilename(filetypes=[("PDF files", "*.pdf")])
-    if file_path:
-        try:
-            # Title from filename
-            pdf_name = os.path.splitext(os.path.basename(file_path))[0]
-
-            # Convert underscores to spaces and clean
-            natural_title = pdf_name.replace('_', ' ')
-            safe_title = re.sub(r'[\\/*?:"<>|\r\n]', "", natural_title).strip().upper()
-
-            doc = fitz.open(file_path)
-
-            # --- Authors: only first page ---
-            first_page_text = doc[0].get_text()
-            name_pattern = r'([A-Z][\wñÑáéíóúüÁÉÍÓÚÜ\-]*, [A-Z][a-zA-ZñÑáéíóúüÁÉÍÓÚÜ\-]+)'
-            name_lines = re.findall(name_pattern, first_page_text)
-            filtered_names = [name for name in name_lines if "Cainta" not in name and "Rizal" not in name]
-            authors = ", ".join(filtered_names)
-
-            # --- Year: look in first page only ---
-            year_match = re.search(r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{4})\b', first_page_text)
-            year = year_match.group(1) if year_match else ""
-
-            # --- Abstract for keyword extraction: first + second page ---
-                    # --- Abstract for keyword extraction: find the page containing 'Abstract'
-                            # --- Abstract for keyword extraction: find the page containing 'Abstract'
-            abstract_page_index = None
-            for i in range(len(doc)):
-                page_text = doc[i].get_text().strip()
-                if page_text and re.search(r'\babstract\b', page_text, re.IGNORECASE):
-                    abstract_page_index = i
-                    break
-
-                # Get text for keywords
-            if abstract_page_index is not None:
-                pages_to_extract = [abstract_page_index]
-                if abstract_page_index + 1 < len(doc):
-                    pages_to_extract.append(abstract_page_index + 1)
-                abstract_text = "\n".join([doc[i].get_text().strip() for i in pages_to_extract if doc[i].get_text().strip()])
-            else:
-                    # fallback: first two non-empty pages
-                abstract_text = ""
-                for i in range(len(doc)):
-                    page_text = doc[i].get_text().strip()
-                    if page_text:
-                        abstract_text += page_text + "\n"
-                    if abstract_text.count("\n") >= 2:  # approx 2 pages of text
-                        break
-
-
-            doc.close()
-
-            # Fill entries
-            title_entry.delete(0, tk.END)
-            title_entry.insert(0, safe_title)
-
-            if authors_entry:
-                authors_entry.delete(0, tk.END)
-                authors_entry.insert(0, authors)
-
-            if year_entry:
-                year_entry.delete(0, tk.END)
-                year_entry.insert(0, year)
-
-            if keyword_debug_label:
-                keywords = extract_keywords(abstract_text)
-                keyword_debug_label.config(text=keywords)
-
-            # Set file path and preview
-            file_path_var.set(file_path)
-            preview_pdf_first_page(file_path, pdf_preview_canvas)
-
-        except Exception as e:
-            messagebox.showerror("File Error", f"Failed to process PDF:\n{e}")
+    if not file_path:
+        return
+
+    # A newer file replaces whatever was still being read for the previous one
+    previous_job = getattr(title_entry, "metadata_job", None)
+    if previous_job:
+        previous_job.cancel()
+
+    # Set file path and preview
+    file_path_var.set(file_path)
+    preview_pdf_first_page(file_path, pdf_preview_canvas)
+    # The keywords saved with the thesis; the label only shows them
+    title_entry.metadata_keywords = ""
+    if keyword_debug_label:
+        keyword_debug_label.config(text="Extracting keywords...")
+
+    def work(job):
+        job.report(0.1, "Reading PDF...")
+        metadata = extract_pdf_metadata(file_path)
+        if keyword_debug_label:
+            # The first extraction waits for the model (seconds); say so instead of looking stuck
+            job.report(0.5, "Extracting keywords..." if keyword_model.is_loaded() else "Loading keyword model...")
+            metadata["keywords"] = extract_keywords(metadata["abstract_text"])
+        return metadata
+
+    def on_progress(progress, message):
+        if status_label and status_label.winfo_exists():
+            status_label.config(text=f"{os.path.basename(file_path)}: {message}")
+
+    def on_done(metadata):
+        # Ignore results for a file the user has since replaced or cleared
+        if not title_entry.winfo_exists() or file_path_var.get() != file_path:
+            return
+
+        # Fill entries
+        title_entry.delete(0, tk.END)
+        title_entry.insert(0, metadata["title"])
+
+        if authors_entry:
+            authors_entry.delete(0, tk.END)
+            authors_entry.insert(0, metadata["authors"])
+
+        if year_entry:
+            year_entry.delete(0, tk.END)
+            year_entry.insert(0, metadata["year"])
+
+        if keyword_debug_label:
+            title_entry.metadata_keywords = metadata["keywords"]
+            keyword_debug_label.config(text=metadata["keywords"])
+
+        if status_label:
+            status_label.config(text="")
+
+    def on_error(e):
+        if keyword_debug_label and keyword_debug_label.winfo_exists():
+            keyword_debug_label.config(text="")
+        messagebox.showerror("File Error", f"Failed to process PDF:\n{e}")
+
+    title_entry.metadata_job = get_ingest_queue(title_entry).submit(
+        f"Reading {os.path.basename(file_path)}", work,
+        on_progress=on_progress, on_done=on_done, on_error=on_error, kind="metadata"
+    )
 
 
 def preview_pdf_first_page(pdf_path, pdf_preview_canvas):
@@ -148,19 +113,10 @@ def preview_pdf_first_page(pdf_path, pdf_preview_canvas):
     Generates an image preview of the first page of a PDF.
     """
     try:
-        doc = fitz.open(pdf_path)
-        page = doc.load_page(0)
-        zoom_x, zoom_y = 2, 2
-        matrix = fitz.Matrix(zoom_x, zoom_y)
-        pix = page.get_pixmap(matrix=matrix, alpha=False)
-        image_path = "preview_temp.png"
-        pix.save(image_path)
-        image = Image.open(image_path)
-        image = image.resize((750, 950), Image.LANCZOS)
+        image = get_thumbnail(pdf_path, 750, 950)
         photo = ImageTk.PhotoImage(image, master=pdf_preview_canvas)
         pdf_preview_canvas.image = photo
         pdf_preview_canvas.config(image=photo)
-        doc.close()
     except Exception as e:
         messagebox.showerror("Preview Error", f"Could not render PDF preview:\n{e}")
 
@@ -168,69 +124,9 @@ def preview_pdf_first_page(pdf_path, pdf_preview_canvas):
 def save_thesis(title_entry, authors_entry, course_entry, year_entry, file_path_var,
                 keyword_debug_label, root, pdf_preview_canvas, on_success=None):
     """
-    Saves the thesis info to the database and applies watermark to the uploaded PDF.
+    Queues the thesis to be watermarked and saved to the database, then clears
+    the form so the next file can be entered right away.
     """
-    import shutil
-    import os
-    import re
-    import sqlite3
-    from tkinter import messagebox
-
-    from PyPDF2 import PdfReader, PdfWriter
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import letter
-    from reportlab.lib.utils import ImageReader
-    import io
-
-    # --- Function to add watermark ---
-    def add_watermark(input_pdf_path, output_pdf_path, watermark_text="CCC RESEARCH PROPERTY", logo_path="image.png"):
-        packet = io.BytesIO()
-        can = canvas.Canvas(packet, pagesize=letter)
-        page_width, page_height = letter
-
-        # Text watermark
-        font_size = 30
-        can.setFont("Helvetica-Bold", font_size)
-        can.setFillColorRGB(0.6, 0.6, 0.6)
-        text_width = can.stringWidth(watermark_text, "Helvetica-Bold", font_size)
-        x_text = (page_width - text_width) / 2
-        y_text = page_height / 2
-        can.saveState()
-        can.translate(x_text, y_text)
-        can.rotate(45)
-        can.setFillAlpha(0.3)
-        can.drawString(0, 0, watermark_text)
-        can.restoreState()
-
-        # Logo watermark
-        try:
-            logo_width = 100
-            logo_height = 100
-            x_logo = (page_width - logo_width) / 2
-            y_logo = (page_height - logo_height) / 2
-            can.saveState()
-            can.setFillAlpha(0.2)
-            can.drawImage(ImageReader(logo_path), x_logo, y_logo, width=logo_width, height=logo_height, mask='auto')
-            can.restoreState()
-        except Exception as e:
-            print(f"Logo watermark failed: {e}")
-
-        can.save()
-        packet.seek(0)
-
-        watermark_pdf = PdfReader(packet)
-        watermark_page = watermark_pdf.pages[0]
-
-        original_pdf = PdfReader(input_pdf_path)
-        output_pdf = PdfWriter()
-
-        for page in original_pdf.pages:
-            page.merge_page(watermark_page)
-            output_pdf.add_page(page)
-
-        with open(output_pdf_path, "wb") as f:
-            output_pdf.write(f)
-
     # --- Get values ---
     title = title_entry.get().strip()
     authors = authors_entry.get().strip()
@@ -238,58 +134,110 @@ def save_thesis(title_entry, authors_entry, course_entry, year_entry, file_path_
     year = year_entry.get().strip()
     original_file_path = file_path_var.get().strip()
 
-    if not all([title, authors, course, year, original_file_path]):
+    if not all([title, authors, course, year, original_file_path]) or course == "Select Course":
         messagebox.showerror("Error", "Please fill in all required fields and upload a PDF.")
         return
 
-    keywords = keyword_debug_label.cget("text")
+    if not year.isdigit():
+        messagebox.showerror("Error", "Year must be a valid number.")
+        return
 
-    try:
-        project_dir = os.path.dirname(os.path.abspath(__file__))
-        thesis_base_dir = os.path.join(project_dir, "thesis_files")
-        os.makedirs(thesis_base_dir, exist_ok=True)
+    metadata_job = getattr(title_entry, "metadata_job", None)
+    if metadata_job and metadata_job.state in ("queued", "running"):
+        messagebox.showwarning("Please Wait", "The PDF is still being read. Save again once its keywords appear.")
+        return
 
-        course_folder = os.path.join(thesis_base_dir, course.lower())
-        os.makedirs(course_folder, exist_ok=True)
+    keywords = getattr(title_entry, "metadata_keywords", "")
+    project_dir = os.path.dirname(os.path.abspath(__file__))
 
-        filename = os.path.basename(original_file_path)
-        safe_filename = re.sub(r'[\\/*?:"<>|\r\n]', "_", filename)
-        target_path = os.path.join(course_folder, safe_filename)
+    def work(job):
+        def on_copy(copied, total):
+            job.report(0.1 * copied / max(total, 1), "Copying file...")
 
-        # Copy file first
-        shutil.copy2(original_file_path, target_path)
-        relative_path = os.path.relpath(target_path, start=project_dir)
+        stamped = []
+        def watermark(path):
+            def on_page(number, page_count):
+                job.report(0.1 + 0.8 * number / page_count, f"Watermarking page {number}/{page_count}")
 
-        # Apply watermark
+            try:
+                watermark_path = os.path.join(project_dir, "image.png")  # make sure your logo is here
+                add_watermark(path, path, watermark_text="CCC RESEARCH PROPERTY",
+                              logo_path=watermark_path, on_page=on_page)
+                stamped.append(WATERMARK_VERSION)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                print("Watermarking failed:", e)
+
+        def store_pdf(conn):
+            stored = pdf_store.stored_copy(conn, original_file_path)
+            if stored:
+                # Picked from thesis_files: share the stamped file instead of stamping a copy again
+                return stored
+            # One pass copies and hashes the file; identical PDFs are only watermarked and stored once
+            content_hash, target_path = pdf_store.ingest_pdf(original_file_path, prepare=watermark, on_progress=on_copy)
+            watermark_version = stamped[-1] if stamped else pdf_store.known_watermark_version(conn, content_hash)
+            return (pdf_store.relative_path(target_path), content_hash,
+                    pdf_store.known_abstract_page(conn, content_hash), watermark_version)
+
+        conn = sqlite3.connect(db_path, timeout=10.0)
         try:
-            watermark_path = os.path.join(project_dir, "image.png")  # make sure your logo is here
-            add_watermark(target_path, target_path, watermark_text="CCC RESEARCH PROPERTY", logo_path=watermark_path)
-        except Exception as e:
-            print("Watermarking failed:", e)
-
-        # --- Save to database ---
-        db_path = os.path.join(project_dir, "thesis_repository.db")
-        conn = sqlite3.connect(db_path)
-        c = conn.cursor()
-        c.execute('''
-            INSERT INTO theses (title, authors, course, year, keywords, file_path)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (title, authors, course, int(year), keywords, relative_path))
-        conn.commit()
-        conn.close()
-
-        messagebox.showinfo("Success", "Thesis entry saved and watermarked PDF uploaded successfully!")
-
+            for attempt in range(2):
+                relative_path, content_hash, abstract_page, watermark_version = store_pdf(conn)
+
+                try:
+                    # Remember where the abstract is so viewers don't have to search for it
+                    job.report(0.9, "Locating abstract...")
+                    if abstract_page is None:
+                        try:
+                            abstract_page = abstract_page_for_db(pdf_store.absolute_path(relative_path))
+                        except Exception as e:
+                            print("Abstract page detection failed:", e)
+
+                    job.check_cancelled()
+                except JobCancelled:
+                    # Nothing was saved yet, so don't leave the stored file behind (unless another thesis uses it)
+                    pdf_store.release_file(conn, relative_path)
+                    raise
+
+                # --- Save to database ---
+                job.report(0.95, "Saving to database...")
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    pdf_store.claim_file(relative_path)
+                except pdf_store.StoredFileMissing:
+                    conn.rollback()
+                    if attempt:
+                        raise
+                    continue  # e.g. released by a cancelled upload of the same PDF: store it again
+                try:
+                    conn.execute('''
+                        INSERT INTO theses (title, authors, course, year, keywords, file_path, abstract_page, content_hash, watermark_version)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (title, authors, course, int(year), keywords, relative_path, abstract_page, content_hash, watermark_version))
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+                break
+        finally:
+            conn.close()
+
+    def on_done(_):
         if on_success:
             try:
                 on_success()
             except Exception as e:
                 print("Refresh error:", e)
 
-        root.destroy()
+    def on_error(e):
+        messagebox.showerror("Database/File Error", f"Could not save '{title}':\n{e}")
 
-    except Exception as e:
-        messagebox.showerror("Database/File Error", str(e))
+    get_ingest_queue(root).submit(title, work, on_done=on_done, on_error=on_error, kind="save")
+
+    # The job keeps its own copy of the values, so the form can take the next file now
+    clear_fields(title_entry, authors_entry, course_entry, year_entry, file_path_var,
+                 pdf_preview_canvas, keyword_debug_label)
 
 
 def clear_fields(title_entry, authors_entry, course_entry, year_entry, file_path_var, pdf_preview_canvas, keyword_debug_label):
@@ -304,6 +252,7 @@ def clear_fields(title_entry, authors_entry, course_entry, year_entry, file_path
     pdf_preview_canvas.config(image='')
     pdf_preview_canvas.image = None
     keyword_debug_label.config(text="")
+    title_entry.metadata_keywords = ""
 
 
 def open_thesis_entry_form(on_success=None):
@@ -311,6 +260,8 @@ def open_thesis_entry_form(on_success=None):
     Creates and runs the GUI for the thesis entry form.
     """
     init_db()
+    # Start loading the keyword model now so it's ready when a PDF is picked
+    keyword_model.warm_up_in_background()
     root = tk.Toplevel()
     root.title("📚 Thesis Entry Form")
     root.transient()
@@ -363,7 +314,7 @@ def open_thesis_entry_form(on_success=None):
     browse_btn = tk.Button(left_frame, text="📂 Browse", font=font_label, bg="#3498db", fg="white",
                            command=lambda: upload_file_wrapper(
                                course_entry, title_entry, file_path_var, pdf_preview_canvas,
-                               authors_entry, year_entry, keyword_debug_label
+                               authors_entry, year_entry, keyword_debug_label, status_label
                            ))
     browse_btn.grid(row=5, column=1, sticky='e', padx=5, pady=10)
 
@@ -383,6 +334,45 @@ def open_thesis_entry_form(on_success=None):
                          bg="#27ae60", fg="white", width=25, height=2, relief="raised", bd=2)
     save_btn.grid(row=7, column=0, columnspan=2, pady=25)
 
+    # Background jobs (reading, watermarking and saving PDFs)
+    status_label = tk.Label(left_frame, text="", font=("Arial", 10, "italic"), fg="#7f8c8d", bg="#ffffff")
+    status_label.grid(row=8, column=0, columnspan=2, sticky='w', padx=5)
+
+    tk.Label(left_frame, text="Upload Queue:", font=font_label, bg="#ffffff").grid(row=9, column=0, **label_opts)
+    jobs_listbox = tk.Listbox(left_frame, font=("Arial", 10), height=8, width=55)
+    jobs_listbox.grid(row=10, column=0, columnspan=2, sticky='we', padx=5)
+
+    jobs_btn_frame = tk.Frame(left_frame, bg="#ffffff")
+    jobs_btn_frame.grid(row=11, column=0, columnspan=2, pady=10)
+
+    ingest_queue = get_ingest_queue(root)
+    listed_jobs = []
+
+    def refresh_jobs(job=None):
+        if not jobs_listbox.winfo_exists():
+            return
+        listed_jobs[:] = [j for j in ingest_queue.jobs if j.kind == "save"]
+        jobs_listbox.delete(0, tk.END)
+        for j in listed_jobs:
+            jobs_listbox.insert(tk.END, f"{j.label[:40]} — {int(j.progress * 100)}% {j.message}")
+
+    def cancel_selected_job():
+        for index in jobs_listbox.curselection():
+            listed_jobs[index].cancel()
+
+    def clear_finished_jobs():
+        ingest_queue.clear_finished()
+        refresh_jobs()
+
+    tk.Button(jobs_btn_frame, text="✖ Cancel Selected", font=("Arial", 10), bg="#e74c3c", fg="white",
+              command=cancel_selected_job).pack(side=tk.LEFT, padx=5)
+    tk.Button(jobs_btn_frame, text="🧹 Clear Finished", font=("Arial", 10), bg="#95a5a6", fg="white",
+              command=clear_finished_jobs).pack(side=tk.LEFT, padx=5)
+
+    ingest_queue.add_listener(refresh_jobs)
+    root.bind("<Destroy>", lambda e: ingest_queue.remove_listener(refresh_jobs) if e.widget is root else None)
+    refresh_jobs()
+
     # --- RIGHT FRAME (Preview) ---
     right_frame = tk.Frame(root, width=950, height=900, padx=20, pady=20, bg="#f0f3f4", relief="groove", bd=2)
     right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -0,0 +1,330 @@
+import sqlite3
+from collections import OrderedDict
+from tkinter import ttk
+
+# Fired on the treeview when the user changes the selection (see VirtualTreeview)
+SELECT_EVENT = "<<VirtualTreeviewSelect>>"
+
+# Shift or Control held while clicking
+_EXTEND_SELECTION_MASK = 0x0001 | 0x0004
+
+
+class VirtualTreeview:
+    """
+    Shows a long list of rows in an existing ttk.Treeview without creating one
+    Tk item per row.
+
+    The treeview only ever holds as many items ("slots") as fit on screen.
+    Scrolling rewrites the values of those slots instead of moving items, and
+    row values are fetched one page at a time as pages scroll into view, so a
+    list of 100,000 theses opens as fast as a list of 20.
+
+    Because slots are reused for different rows, use selected_keys() /
+    selected_values() rather than tree.selection() for anything that can
+    happen after the user scrolled, and bind <<VirtualTreeviewSelect>> instead
+    of <<TreeviewSelect>>: it only fires when the user changes the selection,
+    not when rows scroll past.
+    """
+    def __init__(self, tree, scrollbar=None, page_size=100, cached_pages=20):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.page_size = page_size
+        self.cached_pages = cached_pages
+
+        self.keys = []
+        self.first = 0  # index of the row shown in the top slot
+        self._fetch_rows = lambda keys: {}
+        self._pages = OrderedDict()
+        self._index_by_key = None
+        self._slots = []  # treeview item ids, top to bottom
+        self._slot_keys = {}  # item id -> key of the row it currently shows
+        self._slot_state = {}  # item id -> (values, tags) last written to Tk
+        self._selected = set()  # keys of the selected rows, on screen or not
+        self._expected_selection = set()
+        self._focus_index = None
+        self._extend_selection = False
+        self._row_metrics = None  # (heading height, row height) once measured
+        self._remeasure_pending = False
+
+        # The treeview itself never scrolls: every slot fits on screen
+        tree.configure(yscrollcommand="")
+        if scrollbar is not None:
+            scrollbar.configure(command=self.yview)
+
+        tree.bind("<Configure>", lambda e: self._render(), add="+")
+        tree.bind("<<TreeviewSelect>>", self._on_tree_select, add="+")
+        tree.bind("<ButtonPress-1>", self._on_click, add="+")
+        tree.bind("<MouseWheel>", self._on_mousewheel)
+        tree.bind("<Button-4>", lambda e: self._scroll_rows(-3))
+        tree.bind("<Button-5>", lambda e: self._scroll_rows(3))
+        tree.bind("<Up>", lambda e: self._move_focus(-1))
+        tree.bind("<Down>", lambda e: self._move_focus(1))
+        tree.bind("<Prior>", lambda e: self._move_focus(-self._visible_rows()))
+        tree.bind("<Next>", lambda e: self._move_focus(self._visible_rows()))
+        tree.bind("<Home>", lambda e: self._move_focus(-len(self.keys)))
+        tree.bind("<End>", lambda e: self._move_focus(len(self.keys)))
+
+    # ---------------- Data ---------------- #
+    def set_source(self, keys, fetch_rows):
+        """
+        Shows the rows identified by keys, in that order. fetch_rows(page_keys)
+        must return {key: values} and is only called for pages that are shown.
+        Clears the selection and scrolls back to the top.
+        """
+        self.keys = list(keys)
+        self._fetch_rows = fetch_rows
+        self._pages.clear()
+        self._index_by_key = None
+        self._selected.clear()
+        self._focus_index = None
+        self.first = 0
+        self._render()
+
+    def set_rows(self, rows):
+        """Shows rows that are already in memory: a list of (key, values)."""
+        self.set_source(*self._memory_source(rows))
+
+    def update_source(self, keys, fetch_rows):
+        """
+        Like set_source, but for a refined result (e.g. live search): rows that
+        are still listed stay selected, the top row stays in place if it is
+        still there, and only slots whose row actually changed are redrawn.
+        """
+        top_key = self.keys[self.first] if self.first < len(self.keys) else None
+        focus_key = self.keys[self._focus_index] if self._focus_index is not None else None
+
+        self.keys = list(keys)
+        self._fetch_rows = fetch_rows
+        self._pages.clear()
+        self._index_by_key = None
+        self._selected = {key for key in self._selected if self.index_of(key) is not None}
+        self._focus_index = self.index_of(focus_key) if focus_key is not None else None
+        top_index = self.index_of(top_key) if top_key is not None else None
+        self.first = top_index or 0
+        self._render()
+
+    def update_rows(self, rows):
+        """update_source() for rows that are already in memory: a list of (key, values)."""
+        self.update_source(*self._memory_source(rows))
+
+    @staticmethod
+    def _memory_source(rows):
+        values_by_key = dict(rows)
+        return [key for key, _ in rows], lambda keys: {key: values_by_key[key] for key in keys}
+
+    def refresh(self):
+        """Forgets fetched pages and redraws, e.g. after rows were edited."""
+        self._pages.clear()
+        self._render()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def index_of(self, key):
+        if self._index_by_key is None:
+            self._index_by_key = {k: i for i, k in enumerate(self.keys)}
+        return self._index_by_key.get(key)
+
+    def values_for(self, key):
+        """Returns the values of a row (fetching its page if needed), or None if it isn't listed."""
+        index = self.index_of(key)
+        return None if index is None else self._row_values(index)
+
+    def key_for_item(self, item):
+        """Returns the key of the row a treeview item (e.g. tree.focus()) is showing."""
+        return self._slot_keys.get(item)
+
+    def selected_keys(self):
+        """Keys of every selected row in display order, including rows scrolled off screen."""
+        if not self._selected:
+            return []
+        return sorted(self._selected, key=lambda key: self.index_of(key))
+
+    def selected_values(self):
+        """(key, values) for every selected row in display order."""
+        return [(key, self.values_for(key)) for key in self.selected_keys()]
+
+    def _row_values(self, index):
+        page_number = index // self.page_size
+        page = self._pages.get(page_number)
+        if page is None:
+            start = page_number * self.page_size
+            page = self._fetch_rows(self.keys[start:start + self.page_size])
+            self._pages[page_number] = page
+            while len(self._pages) > self.cached_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page_number)
+        # A row deleted since the keys were loaded shows up empty
+        return page.get(self.keys[index], ())
+
+    # ---------------- Drawing ---------------- #
+    def _visible_rows(self):
+        height = self.tree.winfo_height()
+        if height <= 1:
+            # Not laid out yet
+            return int(self.tree.cget("height"))
+
+        if self._row_metrics is None and self._slots:
+            bbox = self.tree.bbox(self._slots[0])
+            if bbox:
+                self._row_metrics = (bbox[1], bbox[3])
+        if self._row_metrics is not None:
+            top, row_height = self._row_metrics
+        else:
+            style = self.tree.cget("style") or "Treeview"
+            try:
+                row_height = int(ttk.Style(self.tree).lookup(style, "rowheight"))
+            except (ValueError, TypeError):
+                row_height = 20
+            top = row_height  # the heading is about one row tall
+            # Measure for real once the first slot has been drawn
+            if self._slots and not self._remeasure_pending:
+                self._remeasure_pending = True
+                self.tree.after_idle(self._remeasure)
+        return max(1, (height - top - 2) // row_height)
+
+    def _remeasure(self):
+        self._remeasure_pending = False
+        if self._slots and self.tree.bbox(self._slots[0]):
+            self._render()
+
+    def _render(self):
+        visible = self._visible_rows()
+        self.first = max(0, min(self.first, len(self.keys) - visible))
+        count = min(visible, len(self.keys) - self.first)
+
+        # One slot per row on screen
+        while len(self._slots) < count:
+            self._slots.append(self.tree.insert("", "end"))
+        while len(self._slots) > count:
+            item = self._slots.pop()
+            self._slot_keys.pop(item, None)
+            self._slot_state.pop(item, None)
+            self.tree.delete(item)
+
+        selection = []
+        focus_item = ""
+        for offset, item in enumerate(self._slots):
+            index = self.first + offset
+            key = self.keys[index]
+            self._slot_keys[item] = key
+            # Only talk to Tk for slots that now show something different
+            state = (tuple(self._row_values(index)), ("evenrow" if index % 2 == 0 else "oddrow",))
+            if self._slot_state.get(item) != state:
+                self.tree.item(item, values=state[0], tags=state[1])
+                self._slot_state[item] = state
+            if key in self._selected:
+                selection.append(item)
+            if index == self._focus_index:
+                focus_item = item
+
+        # Remember what we selected so _on_tree_select can tell it apart from a click
+        self._expected_selection = set(selection)
+        if set(self.tree.selection()) != self._expected_selection:
+            self.tree.selection_set(selection)
+        if self.tree.focus() != focus_item:
+            self.tree.focus(focus_item)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        if self.scrollbar is None:
+            return
+        total = len(self.keys)
+        if total == 0:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + len(self._slots)) / total))
+
+    # ---------------- Scrolling ---------------- #
+    def yview(self, *args):
+        """Scrollbar command: 'moveto fraction' or 'scroll n units|pages'."""
+        if args and args[0] == "moveto":
+            self.first = int(float(args[1]) * len(self.keys))
+        elif args and args[0] == "scroll":
+            step = self._visible_rows() if args[2] == "pages" else 1
+            self.first += int(args[1]) * step
+        self._render()
+
+    def see(self, index):
+        """Scrolls so the row at index is on screen."""
+        visible = self._visible_rows()
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + visible:
+            self.first = index - visible + 1
+
+    def _scroll_rows(self, rows):
+        self.first += rows
+        self._render()
+        return "break"
+
+    def _on_mousewheel(self, event):
+        return self._scroll_rows(-3 if event.delta > 0 else 3)
+
+    # ---------------- Selection ---------------- #
+    def _on_click(self, event):
+        self._extend_selection = bool(event.state & _EXTEND_SELECTION_MASK)
+
+    def _on_tree_select(self, event=None):
+        current = set(self.tree.selection())
+        if current == self._expected_selection:
+            return  # caused by _render(), not by the user
+
+        on_screen = {self._slot_keys[item] for item in self._slots}
+        picked = {self._slot_keys[item] for item in current if item in self._slot_keys}
+        if self._extend_selection:
+            # Ctrl/Shift-click: keep selected rows that are scrolled off screen
+            self._selected = (self._selected - on_screen) | picked
+        else:
+            self._selected = picked
+        self._expected_selection = current
+
+        focus = self.tree.focus()
+        if focus in self._slot_keys:
+            self._focus_index = self.first + self._slots.index(focus)
+        self.tree.event_generate(SELECT_EVENT)
+
+    def _move_focus(self, delta):
+        if not self.keys:
+            return "break"
+        start = self._focus_index
+        if start is None:
+            # Nothing focused yet: Up and Down both land on the top row
+            start = self.first - 1 if delta > 0 else self.first + 1
+        index = max(0, min(len(self.keys) - 1, start + delta))
+        self._focus_index = index
+        self._selected = {self.keys[index]}
+        self.see(index)
+        self._render()
+        self.tree.event_generate(SELECT_EVENT)
+        return "break"
+
+
+def sqlite_row_source(db_path, keys_sql, rows_sql, params=(), format_row=tuple):
+    """
+    Builds the (keys, fetch_rows) pair for VirtualTreeview.set_source from SQL.
+
+    keys_sql selects only the key column (e.g. thesis_id), already filtered
+    and ordered; it is run once. rows_sql selects the key first and the
+    displayed columns after it, with '{keys}' where the list of keys of one
+    page goes, e.g. "... WHERE thesis_id IN ({keys})". format_row turns a
+    result row into the values shown in the treeview.
+    """
+    conn = sqlite3.connect(db_path, timeout=10.0)
+    try:
+        keys = [row[0] for row in conn.execute(keys_sql, params)]
+    finally:
+        conn.close()
+
+    def fetch_rows(page_keys):
+        if not page_keys:
+            return {}
+        conn = sqlite3.connect(db_path, timeout=10.0)
+        try:
+            sql = rows_sql.format(keys=", ".join("?" * len(page_keys)))
+            return {row[0]: format_row(row) for row in conn.execute(sql, list(page_keys))}
+        finally:
+            conn.close()
+
+    return keys, fetch_rows
@@ -0,0 +1,149 @@
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
+
+import fitz  # PyMuPDF
+from PyPDF2 import PdfReader, PdfWriter
+from reportlab.pdfgen import canvas
+from reportlab.lib.utils import ImageReader
+
+WATERMARK_TEXT = "CCC RESEARCH PROPERTY"
+# Recorded in theses.watermark_version for every stamped file; bump it when the stamp changes
+WATERMARK_VERSION = 1
+DEFAULT_LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "image.png")
+
+# "pymupdf" stamps each page with one shared XObject; "pypdf2" is the original merge_page path
+ENGINES = ("pymupdf", "pypdf2")
+DEFAULT_ENGINE = "pymupdf"
+
+
+# ---------------- Overlay ---------------- #
+@lru_cache(maxsize=4)
+def _logo_reader(logo_path):
+    """Decodes the logo once per process."""
+    return ImageReader(logo_path)
+
+
+@lru_cache(maxsize=16)
+def build_overlay(page_width, page_height, watermark_text=WATERMARK_TEXT, logo_path=DEFAULT_LOGO_PATH):
+    """
+    Returns a one-page PDF (as bytes) with the text and logo watermark centred
+    on a page of the given size. Cached, so each page size is only drawn once.
+    """
+    packet = io.BytesIO()
+    can = canvas.Canvas(packet, pagesize=(page_width, page_height))
+
+    # Text watermark
+    font_size = 30
+    can.setFont("Helvetica-Bold", font_size)
+    can.setFillColorRGB(0.6, 0.6, 0.6)
+    text_width = can.stringWidth(watermark_text, "Helvetica-Bold", font_size)
+    x_text = (page_width - text_width) / 2
+    y_text = page_height / 2
+    can.saveState()
+    can.translate(x_text, y_text)
+    can.rotate(45)
+    can.setFillAlpha(0.3)
+    can.drawString(0, 0, watermark_text)
+    can.restoreState()
+
+    # Logo watermark
+    if logo_path:
+        try:
+            logo_width = 100
+            logo_height = 100
+            x_logo = (page_width - logo_width) / 2
+            y_logo = (page_height - logo_height) / 2
+            can.saveState()
+            can.setFillAlpha(0.2)
+            can.drawImage(_logo_reader(logo_path), x_logo, y_logo, width=logo_width, height=logo_height, mask='auto')
+            can.restoreState()
+        except Exception as e:
+            print(f"Logo watermark failed: {e}")
+
+    can.save()
+    return packet.getvalue()
+
+
+def _page_size_key(width, height):
+    # Page sizes like 612.0 x 791.9998 should share one overlay
+    return round(float(width)), round(float(height))
+
+
+# ---------------- Engines ---------------- #
+@contextmanager
+def _atomic_output(output_pdf_path):
+    """
+    Yields a temporary path in the destination folder and renames it over
+    output_pdf_path on success, so the output (which may also be the input)
+    is never left half-written.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_pdf_path))
+    temp_fd, temp_path = tempfile.mkstemp(suffix=".pdf", dir=output_dir)
+    os.close(temp_fd)
+    try:
+        yield temp_path
+        os.replace(temp_path, output_pdf_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _watermark_pymupdf(input_pdf_path, output_pdf_path, watermark_text, logo_path, on_page):
+    overlays = {}
+    try:
+        with _atomic_output(output_pdf_path) as temp_path:
+            # The input is closed before the temporary file replaces it
+            with fitz.open(input_pdf_path) as doc:
+                page_count = len(doc)
+                for number, page in enumerate(doc, start=1):
+                    key = _page_size_key(page.rect.width, page.rect.height)
+                    if key not in overlays:
+                        overlays[key] = fitz.open("pdf", build_overlay(*key, watermark_text, logo_path))
+                    # PyMuPDF turns the overlay page into a Form XObject once and
+                    # references that same XObject from every page it is shown on
+                    page.show_pdf_page(page.rect, overlays[key], 0, overlay=True)
+                    if on_page:
+                        on_page(number, page_count)
+                doc.save(temp_path, garbage=1, deflate=True)
+    finally:
+        for overlay in overlays.values():
+            overlay.close()
+
+
+def _watermark_pypdf2(input_pdf_path, output_pdf_path, watermark_text, logo_path, on_page):
+    overlay_pages = {}
+    original_pdf = PdfReader(input_pdf_path)
+    output_pdf = PdfWriter()
+
+    page_count = len(original_pdf.pages)
+    for number, page in enumerate(original_pdf.pages, start=1):
+        key = _page_size_key(page.mediabox.width, page.mediabox.height)
+        if key not in overlay_pages:
+            overlay_pages[key] = PdfReader(io.BytesIO(build_overlay(*key, watermark_text, logo_path))).pages[0]
+        page.merge_page(overlay_pages[key])
+        output_pdf.add_page(page)
+        if on_page:
+            on_page(number, page_count)
+
+    with _atomic_output(output_pdf_path) as temp_path:
+        with open(temp_path, "wb") as f:
+            output_pdf.write(f)
+
+
+def add_watermark(input_pdf_path, output_pdf_path, watermark_text=WATERMARK_TEXT, logo_path=DEFAULT_LOGO_PATH,
+                  on_page=None, engine=DEFAULT_ENGINE):
+    """
+    Stamps every page of a PDF with the text and logo watermark.
+    input_pdf_path and output_pdf_path may be the same file.
+    on_page(page_number, page_count) is called after each page, e.g. to report progress.
+    """
+    if engine == "pymupdf":
+        _watermark_pymupdf(input_pdf_path, output_pdf_path, watermark_text, logo_path, on_page)
+    elif engine == "pypdf2":
+        _watermark_pypdf2(input_pdf_path, output_pdf_path, watermark_text, logo_path, on_page)
+    else:
+        raise ValueError(f"Unknown watermark engine: {engine} (expected one of {ENGINES})")